@@ -0,0 +1,112 @@
+"""Concurrent-writer stress test for the server-side running balance.
+
+Creates a scratch user, hammers it from several threads with single inserts
+and small batches, then checks the ledger: ordered by transaction_id, every
+balance must equal the previous balance plus its amount, and Account_State
+must hold the final one. The scratch user and its rows are removed afterwards.
+Needs a database migrated with `python -m db.migrate up`.
+
+    python -m benchmarks.balance_contention [threads] [writes_per_thread]
+"""
+import random
+import sys
+import threading
+import time
+import uuid
+from decimal import Decimal
+import pandas as pd
+from db.connector import get_connection
+from db.db_functions import insert_transaction, insert_transactions_batch
+
+BATCH_SIZE = 5
+
+
+def create_scratch_user():
+    tag = uuid.uuid4().hex[:12]
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO Users (name, email, username)
+                VALUES (%s, %s, %s)
+                RETURNING user_id
+            """, (f"Stress {tag}", f"stress_{tag}@example.com", f"stress_{tag}"))
+            user_id = cursor.fetchone()[0]
+        conn.commit()
+    return user_id
+
+
+def drop_scratch_user(user_id):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            for table in ("transactions", "SpendingPatternCategories", "SpendingPatterns",
+                          "Account_State", "Users"):
+                cursor.execute(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+        conn.commit()
+
+
+def writer(user_id, writes, seed, counts):
+    rng = random.Random(seed)
+    rows = 0
+    for _ in range(writes):
+        amount = Decimal(rng.randint(-5000, 5000)) / 100
+        if rng.random() < 0.2:
+            batch = pd.DataFrame([{
+                'date': '2024-06-01', 'description': 'stress batch', 'transaction_type': 'Debit',
+                'amount': float(Decimal(rng.randint(-5000, 5000)) / 100), 'category': 'Other',
+                'payment_method': 'Cash', 'merchant': 'Stress'} for _ in range(BATCH_SIZE)])
+            rows += sum(1 for _, ok, _ in insert_transactions_batch(user_id, batch) if ok)
+        elif insert_transaction(user_id, '2024-06-01', 'stress', 'Debit', amount, 'Other', 'Cash', 'Stress'):
+            rows += 1
+    counts.append(rows)
+
+
+def check_ledger(user_id):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) FILTER (WHERE previous IS NOT NULL AND balance <> previous + amount),
+                       COUNT(*)
+                FROM (
+                    SELECT amount, balance,
+                           LAG(balance) OVER (ORDER BY transaction_id) AS previous
+                    FROM transactions
+                    WHERE user_id = %s
+                ) ledger
+            """, (user_id,))
+            broken, total = cursor.fetchone()
+            cursor.execute("""
+                SELECT a.balance = COALESCE(SUM(t.amount), 0)
+                FROM Account_State a LEFT JOIN transactions t ON t.user_id = a.user_id
+                WHERE a.user_id = %s
+                GROUP BY a.balance
+            """, (user_id,))
+            state_matches = cursor.fetchone()[0]
+    return broken, total, state_matches
+
+
+def main(threads=8, writes=200):
+    user_id = create_scratch_user()
+    try:
+        counts = []
+        workers = [threading.Thread(target=writer, args=(user_id, writes, seed, counts))
+                   for seed in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        broken, total, state_matches = check_ledger(user_id)
+        print(f"{threads} threads x {writes} writes: {sum(counts)} rows in {elapsed:.2f}s "
+              f"({sum(counts) / elapsed:.0f} rows/s)")
+        print(f"ledger rows: {total}, inconsistent balances: {broken}, "
+              f"Account_State matches ledger: {state_matches}")
+        return 0 if broken == 0 and state_matches and total == sum(counts) else 1
+    finally:
+        drop_scratch_user(user_id)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    sys.exit(main(*args))
@@ -0,0 +1,56 @@
+"""Figure JSON size and build time versus N for the Dashboard balance chart.
+
+Compares the original per-segment-trace / per-point-annotation figure with
+pages.utils.charts.balance_evolution_figure on synthetic balances.
+
+    python -m benchmarks.balance_figure [n ...]
+"""
+import random
+import sys
+import time
+import plotly.graph_objects as go
+from pages.utils.charts import balance_evolution_figure
+
+
+def legacy_figure(balances, categories):
+    fig = go.Figure()
+    for i in range(1, len(balances)):
+        color = 'green' if balances[i] >= balances[i - 1] else 'red'
+        fig.add_trace(go.Scatter(x=[i, i + 1], y=balances[i - 1:i + 1], mode='lines+markers',
+                                 line=dict(color=color), marker=dict(color=color), name=categories[i]))
+    for i, balance in enumerate(balances):
+        fig.add_annotation(x=i + 1, y=balance, text=f"${balance:.2f}", showarrow=True,
+                           arrowhead=2, ax=0, ay=-10, font=dict(color='white'))
+    return fig
+
+
+def measure(build, *args):
+    started = time.perf_counter()
+    fig = build(*args)
+    size = len(fig.to_json())
+    return time.perf_counter() - started, size, len(fig.data)
+
+
+def run(n, include_legacy):
+    rng = random.Random(n)
+    balances, balance = [], 1000.0
+    for _ in range(n):
+        balance += rng.uniform(-200, 150)
+        balances.append(round(balance, 2))
+    categories = [rng.choice(['Rent', 'Groceries', 'Salary', 'Other']) for _ in range(n)]
+
+    seconds, size, traces = measure(balance_evolution_figure, balances, categories)
+    line = f"{n:>6} points | builder {seconds * 1000:8.1f} ms {size / 1024:9.1f} KB {traces:>2} traces"
+    if include_legacy:
+        legacy_seconds, legacy_size, legacy_traces = measure(legacy_figure, balances, categories)
+        line += (f" | legacy {legacy_seconds * 1000:9.1f} ms {legacy_size / 1024:9.1f} KB "
+                 f"{legacy_traces:>5} traces")
+    print(line)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 5000]
+    for size in sizes:
+        # add_annotation is quadratic: the legacy figure already needs ~2s at 100
+        # points and minutes at 1000, so it is only built for the small sizes
+        run(size, include_legacy=size <= 500)
@@ -0,0 +1,74 @@
+"""Dict-of-rows vs columnar result handling at 10k / 100k / 1M rows.
+
+Runs without a database: the dict path is fed DictRow-like dicts holding the
+same Python objects psycopg2 produces (date, Decimal, str), and the columnar
+path is fed the CSV text `COPY ... TO STDOUT` would send. Each path is timed
+from raw result to DataFrame plus a typical page aggregation.
+
+    python -m benchmarks.columnar_fetch [rows ...]
+"""
+import io
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+import pandas as pd
+
+CATEGORIES = ['Rent', 'Groceries', 'Dining Out', 'Entertainment', 'Utilities',
+              'Transportation', 'Salary', 'Gift', 'Education', 'Insurance', 'Other']
+COLUMNS = ['transaction_id', 'date', 'amount', 'category', 'balance']
+
+
+def synthetic_rows(n, seed=42):
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    balance = Decimal("1000.00")
+    for i in range(n):
+        amount = Decimal(rng.randint(-20000, 15000)) / 100
+        balance += amount
+        yield (i + 1, start + timedelta(days=i * 3650 // n), amount,
+               rng.choice(CATEGORIES), balance)
+
+
+def dict_path(rows):
+    df = pd.DataFrame([dict(zip(COLUMNS, row)) for row in rows])
+    df['date'] = pd.to_datetime(df['date'])
+    return df[df['amount'] < 0].groupby('category')['amount'].sum().abs()
+
+
+def columnar_path(csv_text):
+    df = pd.read_csv(io.StringIO(csv_text), parse_dates=['date'],
+                     dtype={'transaction_id': 'int64', 'amount': 'float64',
+                            'balance': 'float64', 'category': 'category'})
+    return df[df['amount'] < 0].groupby('category', observed=True)['amount'].sum().abs()
+
+
+def run(n):
+    rows = list(synthetic_rows(n))
+    csv_text = "\n".join([",".join(COLUMNS)] + [
+        f"{tid},{day.isoformat()},{amount},{category},{balance}"
+        for tid, day, amount, category, balance in rows]) + "\n"
+
+    started = time.perf_counter()
+    dict_path(rows)
+    dict_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columnar_path(csv_text)
+    columnar_seconds = time.perf_counter() - started
+
+    dict_frame = pd.DataFrame([dict(zip(COLUMNS, row)) for row in rows])
+    columnar_frame = pd.read_csv(io.StringIO(csv_text), parse_dates=['date'],
+                                 dtype={'amount': 'float64', 'balance': 'float64', 'category': 'category'})
+    print(f"{n:>9} rows | dict {dict_seconds * 1000:9.1f} ms "
+          f"{dict_frame.memory_usage(deep=True).sum() / 1e6:8.1f} MB | "
+          f"columnar {columnar_seconds * 1000:9.1f} ms "
+          f"{columnar_frame.memory_usage(deep=True).sum() / 1e6:8.1f} MB | "
+          f"speedup {dict_seconds / columnar_seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,48 @@
+"""Downsampling time and extreme preservation on long balance series.
+
+Builds a random-walk balance series (with a few sharp spikes) per size, runs
+LTTB and min/max bucketing down to the chart's point budget and reports the
+time, the output size and whether the series' highest and lowest balance and
+every spike survived. Exits non-zero if any extreme was dropped.
+
+    python -m benchmarks.downsample [n ...]
+"""
+import sys
+import time
+import numpy as np
+from pages.utils.downsample import DEFAULT_POINTS, lttb_indices, minmax_indices
+
+SPIKES = 5
+
+
+def synthetic_series(n, seed=7):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype='int64') * 86_400_000_000_000  # one point per day, in ns
+    y = 1000 + np.cumsum(rng.normal(0, 50, n))
+    spikes = rng.choice(n, SPIKES, replace=False)
+    y[spikes] += rng.choice([-1, 1], SPIKES) * 1e6
+    return x, y, spikes
+
+
+def run(n, n_out):
+    x, y, spikes = synthetic_series(n)
+    extremes = {int(np.argmin(y)), int(np.argmax(y))}
+    ok = True
+    for name, pick in (("lttb", lambda: lttb_indices(x, y, n_out)),
+                       ("minmax", lambda: minmax_indices(y, n_out))):
+        started = time.perf_counter()
+        keep = pick()
+        seconds = time.perf_counter() - started
+        kept = set(keep.tolist())
+        spikes_kept = sum(int(spike) in kept for spike in spikes)
+        extremes_kept = extremes <= kept
+        ok = ok and extremes_kept and spikes_kept == SPIKES
+        print(f"{n:>9} -> {len(keep):>5} {name:<6} {seconds * 1000:8.1f} ms | "
+              f"min/max kept: {extremes_kept} | spikes kept: {spikes_kept}/{SPIKES}")
+    return ok
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    results = [run(size, DEFAULT_POINTS) for size in sizes]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,92 @@
+"""Time-to-first-token vs total time, streamed and non-streamed, against a stub LLM.
+
+Starts a local OpenAI/Groq-compatible server that returns a fixed completion
+as `chunks` pieces, `delay` seconds apart, and points a ScoreAgent at it. No
+API key or network access is needed, and no database (the agent's cache is
+not used). Checks that both modes return the same text and that streaming
+delivers its first token well before the completion ends.
+
+    python -m benchmarks.llm_streaming [chunks] [delay]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from groq import Groq
+from pages.utils.agent import MODEL_NAME, ScoreAgent
+
+WORDS = "Track every purchase, set a weekly limit and move savings first.".split()
+
+
+def make_handler(chunks, delay):
+    pieces = [WORDS[i % len(WORDS)] + " " for i in range(chunks)]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            if body.get('stream'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for piece in pieces:
+                    time.sleep(delay)
+                    self._event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                self._event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                self.wfile.write(b"data: [DONE]\n\n")
+                return
+
+            time.sleep(delay * len(pieces))
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": MODEL_NAME,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(pieces)}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _event(self, chunk):
+            chunk.update(id="stub", object="chat.completion.chunk", created=0, model=MODEL_NAME)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+    return StubHandler
+
+
+def main(chunks=50, delay=0.02):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(chunks, delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = Groq(api_key="stub", base_url=f"http://127.0.0.1:{server.server_port}")
+        agent = ScoreAgent(client=client)
+        prompt = agent.recommendation_prompt(7.0)
+
+        completion = agent.generate(client, prompt)
+        blocking = agent.metrics[-1]
+        metrics = {}
+        streamed = "".join(agent.generate_stream(client, prompt, metrics))
+    finally:
+        server.shutdown()
+
+    same_text = completion is not None and completion.choices[0].message.content == streamed
+    first = metrics['time_to_first_token']
+    print(f"{chunks} chunks, {delay * 1000:.0f} ms apart")
+    print(f"non-streamed: first text after {blocking['time_to_first_token'] * 1000:7.1f} ms")
+    print(f"streamed:     first token after {first * 1000:7.1f} ms, "
+          f"done after {metrics['total_time'] * 1000:7.1f} ms ({metrics['chunks']} chunks)")
+    print(f"same text: {same_text}")
+    ok = same_text and metrics['completed'] and first < metrics['total_time'] / 2
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    args = [int(sys.argv[1])] if len(sys.argv) > 1 else []
+    if len(sys.argv) > 2:
+        args.append(float(sys.argv[2]))
+    sys.exit(main(*args))
@@ -0,0 +1,46 @@
+"""Score-prompt size: raw JSON rows (the old prompt) vs the compact monthly summary.
+
+Runs without a database or API key: synthetic histories of increasing length
+are summarized with summarize_transactions() and compared, by estimated
+tokens, with the last 100 rows as JSON that fetch_score used to send. Checks
+that every summary stays within PROMPT_TOKEN_BUDGET.
+
+    python -m benchmarks.prompt_size [rows ...]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pages.utils.history_summary import PROMPT_TOKEN_BUDGET, estimate_tokens, summarize_transactions
+
+CATEGORIES = ['Rent', 'Groceries', 'Dining Out', 'Entertainment', 'Utilities',
+              'Transportation', 'Salary', 'Gift', 'Education', 'Insurance', 'Other']
+
+
+def synthetic_history(rows, years=10, seed=5):
+    rng = np.random.default_rng(seed)
+    days = pd.to_timedelta(np.sort(rng.integers(0, 365 * years, rows)), unit='D')
+    amount = np.round(rng.normal(-25.0, 180.0, rows), 2)
+    return pd.DataFrame({
+        'date': pd.Timestamp("2015-01-01") + days,
+        'amount': amount,
+        'category': pd.Categorical(rng.choice(CATEGORIES, rows)),
+        'balance': 1000.0 + np.cumsum(amount),
+    })
+
+
+def run(rows):
+    data = synthetic_history(rows)
+    old_tokens = estimate_tokens(data.tail(100).to_json(date_format='iso'))
+    started = time.perf_counter()
+    summary = summarize_transactions(data)
+    elapsed = time.perf_counter() - started
+    new_tokens = estimate_tokens(summary)
+    print(f"{rows:>9} rows: json (last 100 rows) ~{old_tokens:>5} tokens, "
+          f"summary (all rows) ~{new_tokens:>4} tokens, built in {elapsed * 1000:6.1f} ms")
+    return new_tokens <= PROMPT_TOKEN_BUDGET
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 10_000, 1_000_000]
+    sys.exit(0 if all(run(size) for size in sizes) else 1)
@@ -0,0 +1,61 @@
+"""Users scored per second by the vectorized local scoring engine.
+
+Runs without a database: synthetic frames shaped like
+db.scores.fetch_scoring_inputs() output (six months of rollups, category
+totals, a few budgets and overdraft counts per user) are fed straight to
+compute_features() and score_features().
+
+    python -m benchmarks.score_engine [users ...]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scoring.engine import WINDOW_MONTHS, compute_features, score_features
+
+CATEGORIES = ['Rent', 'Groceries', 'Dining Out', 'Entertainment', 'Utilities',
+              'Transportation', 'Salary', 'Gift', 'Education', 'Insurance', 'Other']
+
+
+def synthetic_inputs(users, seed=11):
+    rng = np.random.default_rng(seed)
+    user_ids = np.arange(1, users + 1)
+    months = pd.date_range("2024-01-01", periods=WINDOW_MONTHS, freq="MS")
+
+    monthly = pd.DataFrame({
+        'user_id': np.repeat(user_ids, WINDOW_MONTHS),
+        'month': np.tile(months, users),
+        'spent': rng.gamma(4.0, 250.0, users * WINDOW_MONTHS),
+        'income': rng.gamma(4.0, 260.0, users * WINDOW_MONTHS),
+    })
+    categories = pd.DataFrame({
+        'user_id': np.repeat(user_ids, len(CATEGORIES)),
+        'category': np.tile(CATEGORIES, users),
+        'spent': rng.gamma(2.0, 100.0, users * len(CATEGORIES)),
+    })
+    budgets = pd.DataFrame({
+        'user_id': np.repeat(user_ids, 2),
+        'date': np.tile(pd.to_datetime(["2023-12-15", "2024-03-10"]), users),
+        'monthly_limit': rng.uniform(500, 1500, users * 2),
+    })
+    overdrafts = pd.DataFrame({
+        'user_id': user_ids,
+        'overdrafts': rng.poisson(0.5, users).astype('float64'),
+    })
+    overdrafts = overdrafts[overdrafts['overdrafts'] > 0]
+    return {'monthly': monthly, 'categories': categories, 'budgets': budgets, 'overdrafts': overdrafts}
+
+
+def run(users):
+    inputs = synthetic_inputs(users)
+    started = time.perf_counter()
+    scores = score_features(compute_features(inputs))
+    elapsed = time.perf_counter() - started
+    print(f"{users:>8} users in {elapsed * 1000:8.1f} ms -> {users / elapsed:>10,.0f} users/s "
+          f"| scores {scores.min():.1f}..{scores.max():.1f}, mean {scores.mean():.2f}")
+    return len(scores) == users
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    sys.exit(0 if all(run(size) for size in sizes) else 1)
@@ -0,0 +1,95 @@
+"""Write-path helpers for the Account_State table.
+
+Account_State holds each user's current balance, latest budget and latest
+score, so "latest X" reads are a primary-key lookup instead of a sort over
+history. Every helper runs on the caller's cursor, inside the caller's
+transaction, before it commits. Transaction inserts serialize on the row lock
+taken by lock_balance(); the budget and score upserts only move the state
+forward, so a concurrent writer committing an older row can't overwrite a
+newer one.
+"""
+
+
+def lock_balance(cursor, user_id):
+    """Lock the user's Account_State row and return their current balance.
+
+    Every transaction insert takes this lock first, so concurrent writers for
+    one user (two sessions, a session and a CSV import) queue up and each
+    computes its running balances from the previous writer's committed result.
+    Transaction ids are drawn while the lock is held, so the ledger order by
+    transaction_id matches the order balances were assigned in.
+    """
+    cursor.execute("""
+        INSERT INTO Account_State (user_id)
+        VALUES (%s)
+        ON CONFLICT (user_id) DO NOTHING
+    """, (user_id,))
+    cursor.execute("""
+        SELECT balance
+        FROM Account_State
+        WHERE user_id = %s
+        FOR UPDATE
+    """, (user_id,))
+    return cursor.fetchone()[0]
+
+
+def has_ledger(cursor, user_id):
+    """Whether any transaction was recorded for the user; the caller holds lock_balance()."""
+    cursor.execute("""
+        SELECT last_transaction_id IS NOT NULL
+        FROM Account_State
+        WHERE user_id = %s
+    """, (user_id,))
+    return cursor.fetchone()[0]
+
+
+def running_balances(balance, amounts):
+    """Balances after each amount, starting from `balance`."""
+    balances = []
+    for amount in amounts:
+        balance += amount
+        balances.append(balance)
+    return balances
+
+
+def advance_ledger(cursor, user_id, balance, transaction_id, transaction_date):
+    """Store the balance after the last inserted row; the caller holds lock_balance()."""
+    cursor.execute("""
+        UPDATE Account_State
+        SET balance = %s,
+            last_transaction_id = %s,
+            last_transaction_date = %s,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = %s
+    """, (balance, transaction_id, transaction_date, user_id))
+
+
+def record_budget(cursor, user_id, budget_id, monthly_limit, budget_date):
+    cursor.execute("""
+        INSERT INTO Account_State (user_id, latest_budget, latest_budget_id, latest_budget_date)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (user_id) DO UPDATE
+        SET latest_budget = EXCLUDED.latest_budget,
+            latest_budget_id = EXCLUDED.latest_budget_id,
+            latest_budget_date = EXCLUDED.latest_budget_date,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE Account_State.latest_budget_id IS NULL
+           OR (EXCLUDED.latest_budget_date, EXCLUDED.latest_budget_id)
+              >= (Account_State.latest_budget_date, Account_State.latest_budget_id)
+    """, (user_id, monthly_limit, budget_id, budget_date))
+
+
+def record_score(cursor, user_id, score_id, score, updated_at):
+    """Call after inserting into Spending_Scores; see also cache.invalidate_user."""
+    cursor.execute("""
+        INSERT INTO Account_State (user_id, latest_score, latest_score_id, score_updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (user_id) DO UPDATE
+        SET latest_score = EXCLUDED.latest_score,
+            latest_score_id = EXCLUDED.latest_score_id,
+            score_updated_at = EXCLUDED.score_updated_at,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE Account_State.latest_score_id IS NULL
+           OR (EXCLUDED.score_updated_at, EXCLUDED.latest_score_id)
+              >= (Account_State.score_updated_at, Account_State.latest_score_id)
+    """, (user_id, score, score_id, updated_at))
@@ -0,0 +1,102 @@
+import threading
+import time
+
+
+class TTLCache:
+    """Small thread-safe key/value cache with per-entry expiry and hit/miss counters.
+
+    Entries are also indexed by user_id so every write path can drop whatever
+    was cached for the user it just changed.
+    """
+
+    def __init__(self, ttl=60.0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, user_id, value)
+        self._keys_by_user = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return True, entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, user_id=None):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            elif len(self._entries) >= self.maxsize:
+                # Evict whichever entry expires first
+                self._drop(min(self._entries, key=lambda k: self._entries[k][0]))
+            self._entries[key] = (time.monotonic() + self.ttl, user_id, value)
+            if user_id is not None:
+                self._keys_by_user.setdefault(user_id, set()).add(key)
+
+    def _drop(self, key):
+        _, user_id, _ = self._entries.pop(key)
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+
+# fetch_user_info results keyed by username. The TTL only bounds staleness
+# from writers in other processes; in-process writes invalidate immediately.
+user_info_cache = TTLCache(ttl=60.0)
+
+
+# Per-user counter bumped on every write; caches built from a user's data
+# (e.g. rendered figures) include it in their keys so old entries stop matching
+_data_versions = {}
+_data_versions_lock = threading.Lock()
+
+
+def data_version(user_id):
+    with _data_versions_lock:
+        return _data_versions.get(user_id, 0)
+
+
+def invalidate_user(user_id):
+    """Write-through hook: call after committing any change to a user's data."""
+    user_info_cache.invalidate_user(user_id)
+    with _data_versions_lock:
+        _data_versions[user_id] = _data_versions.get(user_id, 0) + 1
@@ -1,19 +1,79 @@
 import os
+import threading
 from configparser import ConfigParser
 
+# Parsed sections keyed by (filename, section) so database.ini is only read once per process
+_config_cache = {}
+_config_lock = threading.Lock()
 
-def config(filename="db/database.ini", section="postgresql"):
+POOL_DEFAULTS = {
+    "minconn": 1,
+    "maxconn": 10,
+    "timeout": 10.0,
+    "max_idle": 300.0,
+    "health_check_interval": 30.0,
+}
+
+# Where the Spending Analyzer's score comes from: "stored" reads the latest row
+# written to Spending_Scores (e.g. by `python -m scoring.batch`), "local"
+# computes it on the fly with scoring.engine
+SCORING_DEFAULTS = {
+    "scorer": "stored",
+}
+
+
+def _read_section(filename, section):
     parser = ConfigParser()
     with open(filename, 'r', encoding='utf-8') as file:
         parser.read_file(file)
 
-    db = {}
-    if parser.has_section(section):
-        params = parser.items(section)
-        for param in params:
-            #print(f"{param[0]}: {param[1]}")
-            db[param[0]] = param[1]
-    else:
+    if not parser.has_section(section):
+        return None
+    return dict(parser.items(section))
+
+
+def config(filename="db/database.ini", section="postgresql"):
+    key = (filename, section)
+    with _config_lock:
+        if key not in _config_cache:
+            _config_cache[key] = _read_section(filename, section)
+        db = _config_cache[key]
+
+    if db is None:
         raise Exception(f"Section {section} not found in the {filename} file.")
 
-    return db
+    # Callers get their own copy so the cached section can't be mutated
+    return dict(db)
+
+
+def pool_config(filename="db/database.ini", section="pool"):
+    """Pool settings from the optional [pool] section, falling back to POOL_DEFAULTS."""
+    settings = dict(POOL_DEFAULTS)
+    try:
+        overrides = config(filename, section)
+    except Exception:
+        return settings
+
+    for name, default in POOL_DEFAULTS.items():
+        if name in overrides:
+            settings[name] = type(default)(overrides[name])
+    return settings
+
+
+def scoring_config(filename="db/database.ini", section="scoring"):
+    """Settings from the optional [scoring] section, falling back to SCORING_DEFAULTS."""
+    settings = dict(SCORING_DEFAULTS)
+    try:
+        overrides = config(filename, section)
+    except Exception:
+        return settings
+
+    for name in SCORING_DEFAULTS:
+        if name in overrides:
+            settings[name] = overrides[name]
+    return settings
+
+
+def clear_config_cache():
+    with _config_lock:
+        _config_cache.clear()
@@ -1,5 +1,7 @@
+from contextlib import contextmanager
 import psycopg2
 from .config import config
+from .pool import get_pool
 
 
 def connect():
@@ -13,3 +15,28 @@ def connect():
     except (Exception, psycopg2.DatabaseError) as error:
         print("Database connection failed:", error)
         return None
+
+
+@contextmanager
+def get_connection(timeout=None):
+    """Borrow a pooled connection for the duration of a `with` block.
+
+    Yields None if no connection could be obtained, mirroring `connect()`.
+    Uncommitted work is rolled back when the connection goes back to the pool.
+    """
+    try:
+        pool = get_pool()
+        conn = pool.getconn(timeout)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print("Database connection failed:", error)
+        yield None
+        return
+
+    discard = False
+    try:
+        yield conn
+    except psycopg2.InterfaceError:
+        discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard)
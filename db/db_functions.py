@@ -1,509 +1,524 @@
-import csv
-from .connector import connect
-from datetime import datetime, timedelta
+import io
+import pandas as pd
+from .connector import get_connection
+from .ingest import copy_transactions_from_csv, DEFAULT_CHUNK_SIZE
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
 import psycopg2.extras
+from .queries import TRANSACTION_COLUMNS, MONEY_COLUMNS, select_transactions, select_transactions_since, period_has_transactions, sum_by_bucket, rollup_months, rollup_categories, rollup_month_spent, dashboard_snapshot, category_merchant_tree
+from .rollups import apply_transactions
+from .cache import user_info_cache, invalidate_user
+from .account_state import lock_balance, running_balances, advance_ledger, record_budget
 
 
-def insert_transactions_from_csv(user_id, csv_file_path):
-    # Connect to the database
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return
-
+def insert_transactions_from_csv(user_id, csv_file_path, chunk_size=DEFAULT_CHUNK_SIZE):
     try:
         print(f"Inserting transactions for user_id: {user_id}")
-
-        # Open the CSV file and insert transactions
-        with conn.cursor() as cur:
-            with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                # Read all rows into a list to preserve order
-                transactions = list(reader)
-
-                for row in transactions:
-                    cur.execute("""
-                        INSERT INTO transactions (user_id, date, description, transaction_type, amount, category, payment_method, merchant, balance)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
-                    """, (
-                        user_id,
-                        row['Date'],
-                        row['Description'],
-                        row['Transaction Type'],
-                        float(row['Amount']),
-                        row['Category'],
-                        row['Payment Method'],
-                        row['Merchant'],
-                        float(row['Balance'])
-                    ))
-            conn.commit()
-            print("Transactions inserted successfully.")
-
+        # Streams the file through COPY in chunks; safe to re-run after a failure
+        inserted = copy_transactions_from_csv(
+            user_id, csv_file_path, chunk_size=chunk_size)
+        print(f"{inserted} transactions inserted successfully.")
+        return inserted
     except Exception as e:
         print("Error inserting transactions:", e)
-    finally:
-        conn.close()
-        # print("Database connection closed.")
+        return None
 
 
 def fetch_transactions(username, limit=None, order='DESC'):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return []
-
-    try:
-        cursor = conn.cursor()
-        user_query = "SELECT user_id FROM users WHERE username = %s"
-        cursor.execute(user_query, (username,))
-        user_id = cursor.fetchone()
-
-        if user_id is None:
-            print("User not found")
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
             return []
 
-        user_id = user_id[0]
-
-        if order not in ['ASC', 'DESC']:
-            print("Invalid order parameter. Use 'ASC' or 'DESC'.")
+        try:
+            cursor = conn.cursor()
+            user_query = "SELECT user_id FROM users WHERE username = %s"
+            cursor.execute(user_query, (username,))
+            user_id = cursor.fetchone()
+
+            if user_id is None:
+                print("User not found")
+                return []
+
+            user_id = user_id[0]
+
+            if order not in ['ASC', 'DESC']:
+                print("Invalid order parameter. Use 'ASC' or 'DESC'.")
+                return []
+
+            if limit is None:
+                transactions_query = f"""
+                    SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
+                    FROM transactions
+                    WHERE user_id = %s
+                    ORDER BY date {order}, transaction_id {order}
+                """
+                cursor.execute(transactions_query, (user_id,))
+            else:
+                transactions_query = f"""
+                    SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
+                    FROM transactions
+                    WHERE user_id = %s
+                    ORDER BY date {order}, transaction_id {order}
+                    LIMIT %s
+                """
+                cursor.execute(transactions_query, (user_id, limit))
+
+            transactions = cursor.fetchall()
+            cursor.close()
+            return transactions
+
+        except Exception as e:
+            print("Error fetching transactions:", e)
             return []
 
-        if limit is None:
-            transactions_query = f"""
-                SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
-                FROM transactions
-                WHERE user_id = %s
-                ORDER BY date {order}, transaction_id {order}
-            """
-            cursor.execute(transactions_query, (user_id,))
-        else:
-            transactions_query = f"""
-                SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
-                FROM transactions
-                WHERE user_id = %s
-                ORDER BY date {order}, transaction_id {order}
-                LIMIT %s
-            """
-            cursor.execute(transactions_query, (user_id, limit))
 
-        transactions = cursor.fetchall()
-        cursor.close()
-        return transactions
+def fetch_dashboard_snapshot(username, limit=10):
+    """Everything the Dashboard shows, in one round trip.
 
-    except Exception as e:
-        print("Error fetching transactions:", e)
-        return []
-    finally:
-        conn.close()
-        # print("Database connection closed.")
+    Returns a dict with the fetch_user_info fields plus current and last month
+    spend, their month-over-month change in percent (None without last-month
+    spend) and the last `limit` transactions as tuples in fetch_transactions'
+    column order. Returns None if the user doesn't exist or the query fails.
+    """
+    query, params = dashboard_snapshot(username, limit)
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
 
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            cursor.close()
+        except Exception as e:
+            print("Error fetching dashboard snapshot:", e)
+            return None
 
-def insert_transaction(user_id, date, description, transaction_type, amount, category, payment_method, merchant, balance):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return False
+    if row is None:
+        print("User not found")
+        return None
 
-    try:
-        cursor = conn.cursor()
-        insert_query = """
-            INSERT INTO transactions (user_id, date, description, transaction_type, amount, category, payment_method, merchant, balance)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (user_id, date, description, transaction_type,
-                       amount, category, payment_method, merchant, balance))
-        conn.commit()
-        cursor.close()
-        return True
-    except Exception as e:
-        print("Error inserting transaction:", e)
-        return False
-    finally:
-        conn.close()
-        # print("Database connection closed.")
+    user_id, spending_score, balance, latest_budget, current_spent, last_spent, recent = row
+    user_info = {
+        "user_id": user_id,
+        "spending_score": spending_score if spending_score is not None else 0,
+        "balance": balance if balance is not None else 0,
+        "latest_budget": latest_budget if latest_budget is not None else 0
+    }
+    # The snapshot already resolved the user info, so prime the cache with it
+    user_info_cache.set(username, dict(user_info), user_id=user_id)
+
+    current_spent = float(current_spent) if current_spent is not None else 0.0
+    last_spent = float(last_spent) if last_spent is not None else 0.0
+    transactions = [
+        (date.fromisoformat(day), description, transaction_type,
+         Decimal(str(amount)) if amount is not None else None, category, payment_method, merchant,
+         Decimal(str(running_balance)) if running_balance is not None else None)
+        for day, description, transaction_type, amount, category, payment_method, merchant, running_balance
+        in recent
+    ]
+    return {
+        **user_info,
+        "current_month_spending": round(current_spent, 2),
+        "last_month_spending": round(last_spent, 2),
+        "spending_change_pct": (current_spent - last_spent) / last_spent * 100 if last_spent else None,
+        "transactions": transactions,
+    }
+
+
+def insert_transaction(user_id, date, description, transaction_type, amount, category, payment_method, merchant):
+    """Insert one transaction; its running balance is assigned under the account lock."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return False
+
+        try:
+            cursor = conn.cursor()
+            amount = Decimal(str(amount))
+            balance = lock_balance(cursor, user_id) + amount
+            insert_query = """
+                INSERT INTO transactions (user_id, date, description, transaction_type, amount, category, payment_method, merchant, balance)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING transaction_id
+            """
+            cursor.execute(insert_query, (user_id, date, description, transaction_type,
+                           amount, category, payment_method, merchant, balance))
+            transaction_id = cursor.fetchone()[0]
+            apply_transactions(cursor, user_id, [(date, amount, category)])
+            advance_ledger(cursor, user_id, balance, transaction_id, date)
+            conn.commit()
+            invalidate_user(user_id)
+            cursor.close()
+            return True
+        except Exception as e:
+            print("Error inserting transaction:", e)
+            return False
+
+
+BATCH_COLUMNS = ['date', 'description', 'transaction_type', 'amount',
+                 'category', 'payment_method', 'merchant']
+
+
+def _is_missing(value):
+    # None, NaN/NaT (never equal to themselves) and blank strings
+    return value is None or value != value or (isinstance(value, str) and not value.strip())
+
+
+def insert_transactions_batch(user_id, transactions):
+    """Insert every row of the edited DataFrame in one statement and one transaction.
+
+    Balances run on from the account's current balance, read under the row lock
+    that serializes all inserts for the user, over the valid rows in order.
+    Returns a list of (row_index, success, message) tuples, one per input row;
+    rows with missing fields are reported and skipped, and if the insert itself
+    fails none of the rows are written.
+    """
+    statuses = {}
+    values = []
+    valid_indexes = []
+
+    for index, row in transactions.iterrows():
+        missing = [column for column in BATCH_COLUMNS if _is_missing(row.get(column))]
+        if missing:
+            statuses[index] = (index, False, f"Missing {', '.join(missing)}")
+            continue
+        try:
+            amount = Decimal(str(row['amount'])).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            statuses[index] = (index, False, f"Invalid amount {row['amount']!r}")
+            continue
+        values.append((user_id, row['date'], row['description'], row['transaction_type'],
+                       amount, row['category'], row['payment_method'], row['merchant']))
+        valid_indexes.append(index)
+
+    if values:
+        with get_connection() as conn:
+            if conn is None:
+                print("Connection to the database failed.")
+                error = "Connection to the database failed."
+            else:
+                try:
+                    cursor = conn.cursor()
+                    balances = running_balances(
+                        lock_balance(cursor, user_id), [value[4] for value in values])
+                    insert_query = """
+                        INSERT INTO transactions (user_id, date, description, transaction_type, amount, category, payment_method, merchant, balance)
+                        VALUES %s
+                        RETURNING transaction_id
+                    """
+                    # page_size covers the whole batch so it goes out as a single statement
+                    ids = psycopg2.extras.execute_values(
+                        cursor, insert_query,
+                        [value + (balance,) for value, balance in zip(values, balances)],
+                        page_size=len(values), fetch=True)
+                    apply_transactions(
+                        cursor, user_id, [(value[1], value[4], value[5]) for value in values])
+                    advance_ledger(cursor, user_id, balances[-1], ids[-1][0], values[-1][1])
+                    conn.commit()
+                    invalidate_user(user_id)
+                    cursor.close()
+                    error = None
+                except Exception as e:
+                    print("Error inserting transactions batch:", e)
+                    error = str(e)
+
+        for position, index in enumerate(valid_indexes):
+            if error is None:
+                statuses[index] = (index, True, f"Inserted as transaction {ids[position][0]}")
+            else:
+                statuses[index] = (index, False, error)
+
+    return [statuses[index] for index in transactions.index]
 
 
 def fetch_user_info(username):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return None
+    """Score, balance and budget for a user, served from user_info_cache when fresh."""
+    hit, user_info = user_info_cache.get(username)
+    if not hit:
+        user_info = _load_user_info(username)
+        if user_info is None:
+            return None
+        user_info_cache.set(username, user_info, user_id=user_info["user_id"])
+    # Hand out a copy so callers can't modify the cached entry
+    return dict(user_info)
 
-    try:
-        cursor = conn.cursor()
-        query = """
-            SELECT u.user_id, 
-                   (SELECT score FROM Spending_Scores WHERE user_id = u.user_id ORDER BY updated_at DESC LIMIT 1) AS spending_score,
-                   (SELECT balance FROM transactions WHERE user_id = u.user_id ORDER BY date DESC LIMIT 1) AS balance,
-                   (SELECT monthly_limit FROM Budgets WHERE user_id = u.user_id ORDER BY date DESC, budget_id DESC LIMIT 1) AS latest_budget
-            FROM users u
-            WHERE u.username = %s
-        """
-        cursor.execute(query, (username,))
-        user_info = cursor.fetchone()
-        cursor.close()
-        if user_info:
-            return {
-                "user_id": user_info[0],
-                "spending_score": user_info[1] if user_info[1] is not None else 0,
-                "balance": user_info[2] if user_info[2] is not None else 0,
-                "latest_budget": user_info[3] if user_info[3] is not None else 0
-            }
-        else:
+
+def _load_user_info(username):
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            # Primary-key read of the maintained Account_State row
+            query = """
+                SELECT u.user_id, a.latest_score AS spending_score, a.balance, a.latest_budget
+                FROM users u
+                LEFT JOIN Account_State a ON a.user_id = u.user_id
+                WHERE u.username = %s
+            """
+            cursor.execute(query, (username,))
+            user_info = cursor.fetchone()
+            cursor.close()
+            if user_info:
+                return {
+                    "user_id": user_info[0],
+                    "spending_score": user_info[1] if user_info[1] is not None else 0,
+                    "balance": user_info[2] if user_info[2] is not None else 0,
+                    "latest_budget": user_info[3] if user_info[3] is not None else 0
+                }
+            else:
+                return None
+        except Exception as e:
+            print("Error fetching user info:", e)
             return None
-    except Exception as e:
-        print("Error fetching user info:", e)
-        return None
-    finally:
-        conn.close()
-        # print("Database connection closed.")
 
 
 def add_budget(user_id, monthly_limit):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return False
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return False
 
-    try:
-        cursor = conn.cursor()
-        query = """
-            INSERT INTO Budgets (user_id, monthly_limit, date)
-            VALUES (%s, %s, CURRENT_DATE)
-        """
-        cursor.execute(query, (user_id, monthly_limit))
-        conn.commit()
-        cursor.close()
-        print("Budget added successfully.")
-        return True
-    except Exception as e:
-        print("Error adding budget:", e)
-        return False
-    finally:
-        conn.close()
-        # print("Database connection closed.")
+        try:
+            cursor = conn.cursor()
+            query = """
+                INSERT INTO Budgets (user_id, monthly_limit, date)
+                VALUES (%s, %s, CURRENT_DATE)
+                RETURNING budget_id, monthly_limit, date
+            """
+            cursor.execute(query, (user_id, monthly_limit))
+            budget_id, limit, budget_date = cursor.fetchone()
+            record_budget(cursor, user_id, budget_id, limit, budget_date)
+            conn.commit()
+            invalidate_user(user_id)
+            cursor.close()
+            print("Budget added successfully.")
+            return True
+        except Exception as e:
+            print("Error adding budget:", e)
+            return False
+
+
+def _rollup_month_spent(user_id, month):
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            # Single primary-key read from the monthly rollup
+            query, params = rollup_month_spent(user_id, month)
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            cursor.close()
+            return row[0] if row is not None else None
+        except Exception as e:
+            print("Error calculating user spending:", e)
+            return None
 
 
 def calculate_user_spending_last_month(user_id):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return None
-
-    try:
-        cursor = conn.cursor()
-        # Calculate the first and last day of the previous month
-        today = datetime.today()
-        first_day_last_month = (today.replace(
-            day=1) - timedelta(days=1)).replace(day=1)
-        last_day_last_month = today.replace(day=1) - timedelta(days=1)
-
-        query = """
-            SELECT ABS(SUM(amount))
-            FROM transactions
-            WHERE user_id = %s
-              AND date >= %s
-              AND date <= %s
-              AND amount < 0
-        """
-        cursor.execute(
-            query, (user_id, first_day_last_month, last_day_last_month))
-        budget_used = cursor.fetchone()[0]
-        cursor.close()
-        return float(budget_used) if budget_used is not None else 0.0
-    except Exception as e:
-        print("Error calculating user spending:", e)
-        return 0.0
-    finally:
-        conn.close()
-        # print("Database connection closed.")
+    first_day_current_month = datetime.today().date().replace(day=1)
+    first_day_last_month = (first_day_current_month - timedelta(days=1)).replace(day=1)
+    budget_used = _rollup_month_spent(user_id, first_day_last_month)
+    return float(budget_used) if budget_used is not None else 0.0
 
 
 def calculate_user_spending_current_month(user_id):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return None
-
-    try:
-        cursor = conn.cursor()
-        # Calculate the first and last day of the current month
-        today = datetime.today()
-        first_day_current_month = today.replace(day=1)
-        last_day_current_month = (today.replace(
-            day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-
-        query = """
-            SELECT ABS(SUM(amount))
-            FROM transactions
-            WHERE user_id = %s
-              AND date >= %s
-              AND date <= %s
-              AND amount < 0
-        """
-        cursor.execute(
-            query, (user_id, first_day_current_month, last_day_current_month))
-        budget_used = cursor.fetchone()[0]
-        cursor.close()
-        return float(f"{budget_used:.2f}") if budget_used is not None else 0.0
-    except Exception as e:
-        print("Error calculating user spending:", e)
-        return 0.0
-    finally:
-        conn.close()
-        # print("Database connection closed.")
+    first_day_current_month = datetime.today().date().replace(day=1)
+    budget_used = _rollup_month_spent(user_id, first_day_current_month)
+    return float(f"{budget_used:.2f}") if budget_used is not None else 0.0
 
 
 def fetch_user_transactions_current_month(user_id):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return []
-
-    try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        # Calculate the first and last day of the current month
-        today = datetime.today()
-        first_day_current_month = today.replace(day=1)
-        last_day_current_month = (today.replace(
-            day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-
-        query = """
-            SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
-            FROM transactions
-            WHERE user_id = %s
-              AND date >= %s
-              AND date <= %s
-        """
-        cursor.execute(
-            query, (user_id, first_day_current_month, last_day_current_month))
-        transactions = cursor.fetchall()
-        cursor.close()
-        return [dict(transaction) for transaction in transactions]
-    except Exception as e:
-        print("Error fetching transactions:", e)
-        return []
-    finally:
-        conn.close()
-        # print("Database connection closed.")
-
-
-def fetch_spending_scores(user_id):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return []
-
-    try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        query = """
-            SELECT score, updated_at
-            FROM Spending_Scores
-            WHERE user_id = %s
-            ORDER BY updated_at ASC
-        """
-        cursor.execute(query, (user_id,))
-        scores = cursor.fetchall()
-        cursor.close()
-        return [dict(score) for score in scores]
-    except Exception as e:
-        print("Error fetching spending scores:", e)
-        return []
-    finally:
-        conn.close()
-        # print("Database connection closed.")
-
-
-def fetch_transactions_by_period(user_id, period, year=None):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return []
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return []
 
-    try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        today = datetime.today()
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            # Calculate the first and last day of the current month
+            today = datetime.today()
+            first_day_current_month = today.replace(day=1)
+            last_day_current_month = (today.replace(
+                day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
 
-        if period == "All time":
             query = """
-                SELECT date, description,transaction_id, transaction_type, amount, category, payment_method, merchant, balance
-                FROM transactions
-                WHERE user_id = %s
-                ORDER BY date ASC
-            """
-            cursor.execute(query, (user_id,))
-        elif period == "Last year":
-            first_day_last_year = today.replace(year=today.year - 1, month=1, day=1)
-            last_day_last_year = today.replace(year=today.year - 1, month=12, day=31)
-            query = """
-                SELECT date, description,transaction_id transaction_type, amount, category, payment_method, merchant, balance
-                FROM transactions
-                WHERE user_id = %s
-                  AND date >= %s
-                  AND date <= %s
-                ORDER BY date ASC
-            """
-            cursor.execute(query, (user_id, first_day_last_year, last_day_last_year))
-        elif period == "Last month":
-            first_day_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-            last_day_last_month = today.replace(day=1) - timedelta(days=1)
-            query = """
-                SELECT date, description, transaction_id, transaction_type, amount, category, payment_method, merchant, balance
+                SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
                 FROM transactions
                 WHERE user_id = %s
                   AND date >= %s
                   AND date <= %s
-                ORDER BY date ASC
             """
-            cursor.execute(query, (user_id, first_day_last_month, last_day_last_month))
-        elif period == "Year":
-            first_day_year = datetime(year, 1, 1)
-            last_day_year = datetime(year, 12, 31)
+            cursor.execute(
+                query, (user_id, first_day_current_month, last_day_current_month))
+            transactions = cursor.fetchall()
+            cursor.close()
+            return [dict(transaction) for transaction in transactions]
+        except Exception as e:
+            print("Error fetching transactions:", e)
+            return []
+
+
+def fetch_spending_scores(user_id):
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return []
+
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             query = """
-                SELECT date, description, transaction_id, transaction_type, amount, category, payment_method, merchant, balance
-                FROM transactions
+                SELECT score, updated_at
+                FROM Spending_Scores
                 WHERE user_id = %s
-                  AND date >= %s
-                  AND date <= %s
-                ORDER BY date ASC
+                ORDER BY updated_at ASC
             """
-            cursor.execute(query, (user_id, first_day_year, last_day_year))
+            cursor.execute(query, (user_id,))
+            scores = cursor.fetchall()
+            cursor.close()
+            return [dict(score) for score in scores]
+        except Exception as e:
+            print("Error fetching spending scores:", e)
+            return []
 
-        transactions = cursor.fetchall()
-        cursor.close()
-        return [dict(transaction) for transaction in transactions]
-    except Exception as e:
-        print("Error fetching transactions:", e)
-        return []
-    finally:
-        conn.close()
 
+def _fetch_dicts(query, params, error_message):
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return []
 
-def fetch_transactions_for_candles(user_id, period, year=None):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return []
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(error_message, e)
+            return []
 
-    try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        today = datetime.today()
 
-        if period == "All time":
-            query = """
-                SELECT date, amount
-                FROM transactions
-                WHERE user_id = %s
-                ORDER BY date ASC
-            """
-            cursor.execute(query, (user_id,))
-        elif period == "Last year":
-            first_day_last_year = today.replace(year=today.year - 1, month=1, day=1)
-            last_day_last_year = today.replace(year=today.year - 1, month=12, day=31)
-            query = """
-                SELECT date, amount
-                FROM transactions
-                WHERE user_id = %s
-                  AND date >= %s
-                  AND date <= %s
-                ORDER BY date ASC
-            """
-            cursor.execute(query, (user_id, first_day_last_year, last_day_last_year))
-        elif period == "Last month":
-            first_day_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-            last_day_last_month = today.replace(day=1) - timedelta(days=1)
-            query = """
-                SELECT date, amount
-                FROM transactions
-                WHERE user_id = %s
-                  AND date >= %s
-                  AND date <= %s
-                ORDER BY date ASC
-            """
-            cursor.execute(query, (user_id, first_day_last_month, last_day_last_month))
-        elif period == "Year":
-            first_day_year = datetime(year, 1, 1)
-            last_day_year = datetime(year, 12, 31)
-            query = """
-                SELECT date, amount
-                FROM transactions
-                WHERE user_id = %s
-                  AND date >= %s
-                  AND date <= %s
-                ORDER BY date ASC
-            """
-            cursor.execute(query, (user_id, first_day_year, last_day_year))
+def has_transactions_in_period(user_id, period, year=None):
+    query, params = period_has_transactions(user_id, period, year)
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return False
 
-        transactions = cursor.fetchall()
-        cursor.close()
-        return [dict(transaction) for transaction in transactions]
-    except Exception as e:
-        print("Error fetching transactions for candles:", e)
-        return []
-    finally:
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            exists = cursor.fetchone()[0]
+            cursor.close()
+            return exists
+        except Exception as e:
+            print("Error checking for transactions:", e)
+            return False
 
-def fetch_expenses_by_category(user_id, period, year=None):
-    conn = connect()
-    if conn is None:
-        print("Connection to the database failed.")
-        return []
 
-    try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        today = datetime.today()
+def fetch_transactions_by_period(user_id, period, year=None, columns=TRANSACTION_COLUMNS):
+    query, params = select_transactions(user_id, period, year, columns)
+    return _fetch_dicts(query, params, "Error fetching transactions:")
 
-        if period == "All time":
-            query = """
-                SELECT category, SUM(amount) as total_amount
-                FROM transactions
-                WHERE user_id = %s AND amount < 0
-                GROUP BY category
-                ORDER BY category ASC
-            """
-            cursor.execute(query, (user_id,))
-        elif period == "Last year":
-            first_day_last_year = today.replace(year=today.year - 1, month=1, day=1)
-            last_day_last_year = today.replace(year=today.year - 1, month=12, day=31)
-            query = """
-                SELECT category, SUM(amount) as total_amount
-                FROM transactions
-                WHERE user_id = %s AND amount < 0
-                  AND date >= %s AND date <= %s
-                GROUP BY category
-                ORDER BY category ASC
-            """
-            cursor.execute(query, (user_id, first_day_last_year, last_day_last_year))
-        elif period == "Last month":
-            first_day_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-            last_day_last_month = today.replace(day=1) - timedelta(days=1)
-            query = """
-                SELECT category, SUM(amount) as total_amount
-                FROM transactions
-                WHERE user_id = %s AND amount < 0
-                  AND date >= %s AND date <= %s
-                GROUP BY category
-                ORDER BY category ASC
-            """
-            cursor.execute(query, (user_id, first_day_last_month, last_day_last_month))
-        elif period == "Year":
-            first_day_year = datetime(year, 1, 1)
-            last_day_year = datetime(year, 12, 31)
-            query = """
-                SELECT category, SUM(amount) as total_amount
-                FROM transactions
-                WHERE user_id = %s AND amount < 0
-                  AND date >= %s AND date <= %s
-                GROUP BY category
-                ORDER BY category ASC
-            """
-            cursor.execute(query, (user_id, first_day_year, last_day_year))
 
-        expenses = cursor.fetchall()
-        cursor.close()
-        return [dict(expense) for expense in expenses]
-    except Exception as e:
-        print("Error fetching expenses by category:", e)
-        return []
-    finally:
-        conn.close()
\ No newline at end of file
+def fetch_transactions_for_candles(user_id, period, year=None):
+    query, params = select_transactions(user_id, period, year, ('date', 'amount'))
+    return _fetch_dicts(query, params, "Error fetching transactions for candles:")
+
+
+def fetch_period_buckets(user_id, period, year=None, bucket='month'):
+    """Per-bucket expense and income totals, aggregated in Postgres."""
+    if bucket == 'month':
+        query, params = rollup_months(user_id, period, year)
+    else:
+        query, params = sum_by_bucket(user_id, period, year, bucket)
+    return _fetch_dicts(query, params, "Error fetching period buckets:")
+
+
+def fetch_expenses_by_category(user_id, period, year=None):
+    query, params = rollup_categories(user_id, period, year)
+    return _fetch_dicts(query, params, "Error fetching expenses by category:")
+
+
+def fetch_budget_hierarchy(user_id, top_k=5, period="Current month", year=None):
+    """Aggregated category -> merchant expense nodes for the budget sunburst."""
+    query, params = category_merchant_tree(user_id, period, year, top_k)
+    return _fetch_dicts(query, params, "Error fetching budget hierarchy:")
+
+
+# Low-cardinality text columns are returned as pandas categoricals
+CATEGORICAL_COLUMNS = ('transaction_type', 'category', 'payment_method', 'merchant')
+
+
+def fetch_transactions_columnar(user_id, period, year=None, columns=TRANSACTION_COLUMNS, money='float', as_numpy=False):
+    """Period rows as typed columns instead of a list of dicts.
+
+    The result is streamed with COPY ... TO STDOUT and parsed by pandas' C CSV
+    reader, so no per-row Python objects (DictRow, Decimal, date) are created.
+    Dates come back as datetime64, amount/balance as float64 or, with
+    money='cents', as exact integer cents, and the text columns listed in
+    CATEGORICAL_COLUMNS as categoricals. With `as_numpy` a dict of column name
+    to NumPy array is returned instead of a DataFrame.
+    """
+    if money not in ('float', 'cents'):
+        raise ValueError("Invalid money parameter. Use 'float' or 'cents'.")
+    columns = list(columns)
+    query, params = select_transactions(
+        user_id, period, year, columns, money_as_cents=(money == 'cents'))
+    df = _copy_columnar(query, params, columns, money)
+
+    if as_numpy:
+        return {column: df[column].to_numpy() for column in columns}
+    return df
+
+
+def fetch_transactions_since(user_id, after_id=0, columns=TRANSACTION_COLUMNS, money='float'):
+    """Columnar rows with transaction_id > after_id, in insertion order (see fetch_transactions_columnar)."""
+    if money not in ('float', 'cents'):
+        raise ValueError("Invalid money parameter. Use 'float' or 'cents'.")
+    columns = list(columns)
+    query, params = select_transactions_since(
+        user_id, after_id, columns, money_as_cents=(money == 'cents'))
+    return _copy_columnar(query, params, columns, money)
+
+
+def _copy_columnar(query, params, columns, money):
+    dtypes = {column: 'category' for column in columns if column in CATEGORICAL_COLUMNS}
+    for column in columns:
+        if column in MONEY_COLUMNS:
+            # Nullable Int64, since balance can be NULL
+            dtypes[column] = 'Int64' if money == 'cents' else 'float64'
+        elif column == 'transaction_id':
+            dtypes[column] = 'int64'
+        elif column == 'description':
+            dtypes[column] = 'object'
+    empty = pd.DataFrame({column: pd.Series(dtype=dtypes.get(column, 'datetime64[ns]'))
+                          for column in columns})
+
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return empty
+
+        try:
+            cursor = conn.cursor()
+            buffer = io.StringIO()
+            copy_query = cursor.mogrify(query, params).decode()
+            cursor.copy_expert(f"COPY ({copy_query}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+            cursor.close()
+            buffer.seek(0)
+            df = pd.read_csv(buffer, dtype=dtypes,
+                             parse_dates=['date'] if 'date' in columns else False)
+            return empty if df.empty else df
+        except Exception as e:
+            print("Error fetching transactions:", e)
+            return empty
@@ -0,0 +1,249 @@
+import csv
+import hashlib
+import io
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from .connector import get_connection
+from .rollups import apply_transactions
+from .cache import invalidate_user
+from .account_state import lock_balance, has_ledger, running_balances, advance_ledger
+
+# Column order used for COPY; user_id is prepended to every row
+COPY_COLUMNS = ["date", "description", "transaction_type", "amount",
+                "category", "payment_method", "merchant", "balance"]
+
+# Header spellings seen in bank exports mapped onto transactions columns
+COLUMN_ALIASES = {
+    "transaction_date": "date",
+    "posted_date": "date",
+    "type": "transaction_type",
+    "payment": "payment_method",
+    "vendor": "merchant",
+    "payee": "merchant",
+    "running_balance": "balance",
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d")
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class CsvImportError(Exception):
+    pass
+
+
+def normalize_header(name):
+    key = name.strip().lower().replace(" ", "_").replace("-", "_")
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+def _parse_money(value):
+    value = value.strip().replace("$", "").replace(",", "")
+    if value == "":
+        return None
+    # Accountancy style negatives: (12.50)
+    if value.startswith("(") and value.endswith(")"):
+        value = "-" + value[1:-1]
+    try:
+        return str(Decimal(value).quantize(Decimal("0.01")))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}")
+
+
+def _text(value, limit):
+    value = (value or "").strip()
+    return value[:limit] if value else None
+
+
+def convert_row(row):
+    """Turn one normalized CSV record into the COPY_COLUMNS values."""
+    if not row.get("date") or not row.get("amount"):
+        raise ValueError("date and amount are required")
+    return [
+        _parse_date(row["date"]),
+        _text(row.get("description"), 255),
+        _text(row.get("transaction_type"), 50),
+        _parse_money(row["amount"]),
+        _text(row.get("category"), 50),
+        _text(row.get("payment_method"), 50),
+        _text(row.get("merchant"), 100),
+        _parse_money(row.get("balance") or ""),
+    ]
+
+
+def import_source_key(csv_file_path):
+    return os.path.abspath(csv_file_path)
+
+
+def _hash_row(digest, fields):
+    digest.update("\x1f".join(fields).encode("utf-8") + b"\n")
+
+
+def print_progress(rows_done):
+    print(f"  {rows_done} rows committed")
+
+
+def _committed_rows(cur, user_id, source):
+    cur.execute("""
+        INSERT INTO Import_Progress (user_id, source)
+        VALUES (%s, %s)
+        ON CONFLICT (user_id, source) DO NOTHING
+    """, (user_id, source))
+    cur.execute("""
+        SELECT rows_committed, prefix_sha256, completed_at
+        FROM Import_Progress
+        WHERE user_id = %s AND source = %s
+    """, (user_id, source))
+    return cur.fetchone()
+
+
+def _copy_chunk(cur, user_id, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for values in rows:
+        writer.writerow([user_id] + values)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY transactions (user_id, {', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer)
+
+
+def copy_transactions_from_csv(user_id, csv_file_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=print_progress):
+    """Stream a CSV export into transactions with COPY, one commit per chunk.
+
+    Only `chunk_size` rows are held in memory at a time. Each chunk is committed
+    together with its Import_Progress checkpoint, so re-running the same file
+    after a failure skips the rows that already made it in. Returns the number
+    of rows inserted by this call.
+
+    Progress is kept per (user, file path) with a hash of the header and the
+    committed rows. A file whose committed rows are unchanged resumes after
+    them, whether it was fixed after a bad row or re-exported with more rows
+    appended. Any other change is refused instead of importing rows twice.
+
+    Balances follow the account's ledger. For an account without transactions
+    the ledger opens at the file's first Balance minus its first Amount; later
+    Balance values that disagree with the ledger are reported, not stored.
+    """
+    source = import_source_key(csv_file_path)
+    inserted = 0
+    # Rows whose Balance column disagrees with the ledger, and the first of them
+    mismatches = [0, None]
+
+    with get_connection() as conn:
+        if conn is None:
+            raise CsvImportError("Connection to the database failed.")
+
+        with conn.cursor() as cur:
+            rows_committed, committed_hash, completed_at = _committed_rows(cur, user_id, source)
+            conn.commit()
+            if rows_committed and completed_at is None:
+                print(f"Resuming import after {rows_committed} committed rows.")
+            mismatch = CsvImportError(
+                f"{csv_file_path} no longer starts with the {rows_committed} rows already imported "
+                f"for user_id {user_id}; refusing to import it again. Restore those rows, or delete "
+                "its Import_Progress row and the imported transactions to start over.")
+
+            with open(csv_file_path, newline='', encoding='utf-8-sig') as csvfile:
+                reader = csv.reader(csvfile)
+                header = next(reader, None)
+                if header is None:
+                    raise CsvImportError(f"{csv_file_path} is empty.")
+                digest = hashlib.sha256()
+                _hash_row(digest, header)
+                columns = [normalize_header(name) for name in header]
+                missing = {"date", "amount"} - set(columns)
+                if missing:
+                    raise CsvImportError(f"Missing required columns: {', '.join(sorted(missing))}")
+
+                position = 0
+                chunk = []
+
+                def flush():
+                    # Balances continue the account's ledger rather than the file's
+                    # Balance column, computed under the same lock as every other insert
+                    balance = lock_balance(cur, user_id)
+                    first = chunk[0]
+                    if first[7] is not None and not has_ledger(cur, user_id):
+                        # A new account opens at the balance the export started from
+                        balance = Decimal(first[7]) - Decimal(first[3])
+                    balances = running_balances(balance, [Decimal(values[3]) for values in chunk])
+                    for offset, (values, balance) in enumerate(zip(chunk, balances)):
+                        if values[7] is not None and Decimal(values[7]) != balance:
+                            mismatches[0] += 1
+                            if mismatches[1] is None:
+                                mismatches[1] = position - len(chunk) + offset + 1
+                        values[7] = str(balance)
+                    _copy_chunk(cur, user_id, chunk)
+                    cur.execute("SELECT currval(pg_get_serial_sequence('transactions', 'transaction_id'))")
+                    advance_ledger(cur, user_id, balances[-1], cur.fetchone()[0], chunk[-1][0])
+                    apply_transactions(
+                        cur, user_id, [(values[0], values[3], values[4]) for values in chunk])
+                    cur.execute("""
+                        UPDATE Import_Progress SET rows_committed = %s, prefix_sha256 = %s
+                        WHERE user_id = %s AND source = %s
+                    """, (position, digest.hexdigest(), user_id, source))
+                    conn.commit()
+                    invalidate_user(user_id)
+                    if progress is not None:
+                        progress(position)
+
+                for line in reader:
+                    if not any(field.strip() for field in line):
+                        continue
+                    position += 1
+                    _hash_row(digest, line)
+                    if position <= rows_committed:
+                        if position == rows_committed and digest.hexdigest() != committed_hash:
+                            raise mismatch
+                        continue
+                    try:
+                        chunk.append(convert_row(dict(zip(columns, line))))
+                    except ValueError as error:
+                        raise CsvImportError(
+                            f"Row {position} of {csv_file_path}: {error}") from error
+                    if len(chunk) >= chunk_size:
+                        flush()
+                        inserted += len(chunk)
+                        chunk = []
+
+                if position < rows_committed:
+                    raise mismatch
+                if chunk:
+                    flush()
+                    inserted += len(chunk)
+
+            if mismatches[0]:
+                print(f"Warning: {mismatches[0]} rows of {csv_file_path} (first: row {mismatches[1]}) "
+                      "have a Balance that differs from the account's ledger; the ledger's was kept.")
+
+            cur.execute("""
+                UPDATE Import_Progress SET completed_at = CURRENT_TIMESTAMP
+                WHERE user_id = %s AND source = %s
+            """, (user_id, source))
+            conn.commit()
+
+    if inserted == 0 and completed_at is not None:
+        print(f"{csv_file_path} was already imported for user_id {user_id}.")
+    return inserted
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m db.ingest <user_id> <csv_file> [chunk_size]")
+        sys.exit(1)
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CHUNK_SIZE
+    total = copy_transactions_from_csv(int(sys.argv[1]), sys.argv[2], chunk_size=size)
+    print(f"Inserted {total} transactions.")
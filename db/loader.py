@@ -0,0 +1,68 @@
+"""Run a page's independent queries concurrently over the connection pool.
+
+A page declares everything it needs up front:
+
+    data = load_page_data("Dashboard", {
+        "transactions": (fetch_transactions, username, 10),
+        "month_spending": (calculate_user_spending_current_month, user_id),
+    })
+    data.results["transactions"]
+
+Each entry runs on a shared thread pool and borrows its own pooled
+connection, so the page waits for the slowest query instead of the sum of
+all of them. Query functions must not call Streamlit themselves: worker
+threads have no script context.
+"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .config import pool_config
+
+PageLoad = namedtuple("PageLoad", ["results", "timings", "elapsed"])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # More workers than pooled connections would only queue on the pool
+            _executor = ThreadPoolExecutor(max_workers=pool_config()["maxconn"],
+                                           thread_name_prefix="page-loader")
+        return _executor
+
+
+def _timed(function, args):
+    started = time.perf_counter()
+    try:
+        return function(*args), time.perf_counter() - started
+    except Exception as e:
+        print(f"Error in {getattr(function, '__name__', function)}:", e)
+        return None, time.perf_counter() - started
+
+
+def load_page_data(page, queries, report=True):
+    """Run `queries` ({name: (function, *args)}) concurrently.
+
+    Returns PageLoad(results, timings, elapsed); a query that raises yields None.
+    """
+    started = time.perf_counter()
+    executor = _get_executor()
+    futures = {name: executor.submit(_timed, spec[0], spec[1:])
+               for name, spec in queries.items()}
+
+    results, timings = {}, {}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    elapsed = time.perf_counter() - started
+
+    if report and timings:
+        slowest = max(timings, key=timings.get)
+        print(f"[{page}] loaded {len(timings)} queries in {elapsed * 1000:.0f} ms "
+              f"(serial {sum(timings.values()) * 1000:.0f} ms; slowest {slowest} "
+              f"{timings[slowest] * 1000:.0f} ms): "
+              + ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+    return PageLoad(results, timings, elapsed)
@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+from .connector import connect
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+
+# Arbitrary constant so two runners never apply the same migration at once
+MIGRATION_LOCK_ID = 8154104
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Return (version, name, path) for every numbered .sql file, in version order."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise Exception(f"Duplicate migration versions in {directory}.")
+    return migrations
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Schema_Migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM Schema_Migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def status(conn):
+    with conn.cursor() as cursor:
+        ensure_migrations_table(cursor)
+        applied = applied_versions(cursor)
+    conn.commit()
+    return [(version, name, version in applied) for version, name, _ in load_migrations()]
+
+
+def apply(conn, target=None):
+    """Apply pending migrations up to `target` (inclusive), each in its own transaction."""
+    applied_now = []
+    for version, name, path in load_migrations():
+        if target is not None and version > target:
+            break
+        with conn.cursor() as cursor:
+            ensure_migrations_table(cursor)
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+            if version in applied_versions(cursor):
+                conn.rollback()
+                continue
+            with open(path, 'r', encoding='utf-8') as file:
+                sql = file.read()
+            try:
+                cursor.execute(sql)
+                cursor.execute(
+                    "INSERT INTO Schema_Migrations (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                print(f"Migration {version:04d}_{name} failed; nothing from it was applied.")
+                raise
+        print(f"Applied {version:04d}_{name}")
+        applied_now.append(version)
+    return applied_now
+
+
+def main(argv):
+    command = argv[0] if argv else "status"
+    if command not in ("status", "up"):
+        print("Usage: python -m db.migrate [status | up [target_version]]")
+        return 1
+
+    conn = connect()
+    if conn is None:
+        return 1
+    try:
+        if command == "status":
+            for version, name, is_applied in status(conn):
+                print(f"{'[x]' if is_applied else '[ ]'} {version:04d}_{name}")
+        else:
+            target = int(argv[1]) if len(argv) > 1 else None
+            if not apply(conn, target):
+                print("Database is up to date.")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,26 @@
+-- CSV import checkpoints (db/ingest.py). Databases created from the baseline
+-- schema.sql don't have the table; IF NOT EXISTS keeps this a no-op where they do.
+CREATE TABLE IF NOT EXISTS Import_Progress (
+    user_id INT REFERENCES Users(user_id) ON DELETE CASCADE,
+    source VARCHAR(512) NOT NULL,
+    rows_committed INT NOT NULL DEFAULT 0,
+    prefix_sha256 CHAR(64),
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    PRIMARY KEY (user_id, source)
+);
+
+-- Every transactions query filters on user_id plus a date range and orders by date;
+-- transaction_id breaks ties and the INCLUDE columns let the sums skip the heap.
+CREATE INDEX IF NOT EXISTS transactions_user_date_idx
+    ON Transactions (user_id, date, transaction_id)
+    INCLUDE (amount, balance, category);
+
+-- Latest score / budget lookups in fetch_user_info and the score history chart
+CREATE INDEX IF NOT EXISTS spending_scores_user_updated_idx
+    ON Spending_Scores (user_id, updated_at)
+    INCLUDE (score);
+
+CREATE INDEX IF NOT EXISTS budgets_user_date_idx
+    ON Budgets (user_id, date, budget_id)
+    INCLUDE (monthly_limit);
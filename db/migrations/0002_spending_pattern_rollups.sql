@@ -0,0 +1,30 @@
+CREATE TABLE IF NOT EXISTS SpendingPatternCategories (
+    user_id INT REFERENCES Users(user_id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    total_income DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, category)
+);
+
+-- Backfill from existing history so the rollups are correct from the start.
+-- Old rows may hold duplicate months, so they go before the constraint is added.
+DELETE FROM SpendingPatterns;
+
+-- One SpendingPatterns row per user and month, kept current by db/rollups.py
+ALTER TABLE SpendingPatterns
+    ADD CONSTRAINT spendingpatterns_user_month_key UNIQUE (user_id, month);
+
+INSERT INTO SpendingPatterns (user_id, month, total_spent, total_income)
+SELECT user_id, date_trunc('month', date)::date,
+       COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+       COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0)
+FROM transactions
+GROUP BY 1, 2;
+
+INSERT INTO SpendingPatternCategories (user_id, month, category, total_spent, total_income)
+SELECT user_id, date_trunc('month', date)::date, COALESCE(category, 'Uncategorized'),
+       COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+       COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0)
+FROM transactions
+GROUP BY 1, 2, 3;
@@ -0,0 +1,46 @@
+-- Denormalized "latest X" per user, kept in sync by db/account_state.py on every write
+CREATE TABLE IF NOT EXISTS Account_State (
+    user_id INT PRIMARY KEY REFERENCES Users(user_id) ON DELETE CASCADE,
+    balance DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    last_transaction_id INT,
+    last_transaction_date DATE,
+    latest_budget DECIMAL(10, 2),
+    latest_budget_id INT,
+    latest_budget_date DATE,
+    latest_score DECIMAL(3, 1),
+    latest_score_id INT,
+    score_updated_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO Account_State (user_id)
+SELECT user_id FROM Users
+ON CONFLICT (user_id) DO NOTHING;
+
+-- Latest transaction by (date, transaction_id), so same-day rows resolve deterministically
+UPDATE Account_State a
+SET balance = COALESCE(t.balance, 0), last_transaction_id = t.transaction_id, last_transaction_date = t.date
+FROM (
+    SELECT DISTINCT ON (user_id) user_id, transaction_id, date, balance
+    FROM transactions
+    ORDER BY user_id, date DESC, transaction_id DESC
+) t
+WHERE a.user_id = t.user_id;
+
+UPDATE Account_State a
+SET latest_budget = b.monthly_limit, latest_budget_id = b.budget_id, latest_budget_date = b.date
+FROM (
+    SELECT DISTINCT ON (user_id) user_id, budget_id, monthly_limit, date
+    FROM Budgets
+    ORDER BY user_id, date DESC, budget_id DESC
+) b
+WHERE a.user_id = b.user_id;
+
+UPDATE Account_State a
+SET latest_score = s.score, latest_score_id = s.score_id, score_updated_at = s.updated_at
+FROM (
+    SELECT DISTINCT ON (user_id) user_id, score_id, score, updated_at
+    FROM Spending_Scores
+    ORDER BY user_id, updated_at DESC, score_id DESC
+) s
+WHERE a.user_id = s.user_id;
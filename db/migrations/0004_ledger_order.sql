@@ -0,0 +1,10 @@
+-- Running balances are now assigned in insertion order under the Account_State
+-- row lock, so the current balance is the one on the highest transaction_id.
+UPDATE Account_State a
+SET balance = COALESCE(t.balance, 0), last_transaction_id = t.transaction_id, last_transaction_date = t.date
+FROM (
+    SELECT DISTINCT ON (user_id) user_id, transaction_id, date, balance
+    FROM transactions
+    ORDER BY user_id, transaction_id DESC
+) t
+WHERE a.user_id = t.user_id;
@@ -0,0 +1,14 @@
+-- LLM recommendations keyed by a hash of (cache version, model, prompt); the prompt
+-- embeds the score, so each distinct score/template/model gets its own row.
+CREATE TABLE IF NOT EXISTS Recommendation_Cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    score DECIMAL(3, 1),
+    model VARCHAR(100) NOT NULL,
+    cache_version INT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS recommendation_cache_expires_idx
+    ON Recommendation_Cache (expires_at);
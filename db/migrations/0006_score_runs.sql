@@ -0,0 +1,16 @@
+-- One row per batch scoring run; Spending_Scores rows written by a run point at it,
+-- and (user_id, run_id) is unique so an interrupted run can be resumed with upserts.
+CREATE TABLE IF NOT EXISTS Score_Runs (
+    run_id SERIAL PRIMARY KEY,
+    scorer VARCHAR(50) NOT NULL,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    users_scored INT NOT NULL DEFAULT 0,
+    users_failed INT NOT NULL DEFAULT 0
+);
+
+ALTER TABLE Spending_Scores ADD COLUMN IF NOT EXISTS run_id INT REFERENCES Score_Runs(run_id);
+
+-- Scores written outside a run keep run_id NULL, which never conflicts
+CREATE UNIQUE INDEX IF NOT EXISTS spending_scores_user_run_idx
+    ON Spending_Scores (user_id, run_id);
@@ -0,0 +1,139 @@
+"""EXPLAIN-based regression check for the db_functions access paths.
+
+Seeds a large synthetic dataset into session-local TEMP copies of the tables
+(they shadow the real ones on the search_path and inherit their indexes), runs
+EXPLAIN on each hot query and fails if any of them plans a sequential scan.
+Nothing touches the real tables and the whole run is rolled back.
+
+    python -m db.plan_check [users] [transactions_per_user]
+"""
+import json
+import sys
+from datetime import date
+from .connector import connect
+from .queries import select_transactions, select_transactions_since, period_has_transactions, sum_by_bucket, rollup_months, rollup_categories, rollup_month_spent, dashboard_snapshot, category_merchant_tree
+from .rollups import rebuild
+
+# Seeded transactions span 2019-01-01 to mid 2024
+SEED_TODAY = date(2024, 4, 15)
+
+SEEDED_TABLES = ["users", "transactions", "budgets", "spending_scores",
+                 "spendingpatterns", "spendingpatterncategories", "account_state"]
+
+# (name, sql, params) for every query shape db_functions sends
+PLAN_QUERIES = [
+    ("fetch_user_info", """
+        SELECT u.user_id, a.latest_score AS spending_score, a.balance, a.latest_budget
+        FROM users u
+        LEFT JOIN Account_State a ON a.user_id = u.user_id
+        WHERE u.username = %s
+    """, ("user_7",)),
+    ("fetch_transactions", """
+        SELECT date, description, transaction_type, amount, category, payment_method, merchant, balance
+        FROM transactions
+        WHERE user_id = %s
+        ORDER BY date DESC, transaction_id DESC
+        LIMIT %s
+    """, (7, 10)),
+    ("fetch_dashboard_snapshot",
+     *dashboard_snapshot("user_7", 10, today=SEED_TODAY)),
+    ("calculate_user_spending_current_month",
+     *rollup_month_spent(7, date(2024, 3, 1))),
+    ("fetch_transactions_by_period",
+     *select_transactions(7, "Year", 2023, today=SEED_TODAY)),
+    ("fetch_transactions_columnar (cents)",
+     *select_transactions(7, "Last year", None, ("date", "amount", "balance"),
+                          today=SEED_TODAY, money_as_cents=True)),
+    ("fetch_transactions_since",
+     *select_transactions_since(7, 190)),
+    ("has_transactions_in_period",
+     *period_has_transactions(7, "Last month", today=SEED_TODAY)),
+    ("fetch_period_buckets (day)",
+     *sum_by_bucket(7, "Last month", bucket="day", today=SEED_TODAY)),
+    ("fetch_period_buckets (month)",
+     *rollup_months(7, "Last year", today=SEED_TODAY)),
+    ("fetch_expenses_by_category",
+     *rollup_categories(7, "Last month", today=SEED_TODAY)),
+    ("fetch_budget_hierarchy",
+     *category_merchant_tree(7, "Last month", today=SEED_TODAY)),
+    ("fetch_spending_scores", """
+        SELECT score, updated_at
+        FROM Spending_Scores
+        WHERE user_id = %s
+        ORDER BY updated_at ASC
+    """, (7,)),
+]
+
+
+def seed(cursor, users, per_user):
+    for table in SEEDED_TABLES:
+        cursor.execute(
+            f"CREATE TEMP TABLE {table} (LIKE public.{table} INCLUDING ALL) ON COMMIT DROP")
+
+    cursor.execute("""
+        INSERT INTO users (user_id, name, email, username)
+        SELECT g, 'User ' || g, 'user_' || g || '@example.com', 'user_' || g
+        FROM generate_series(1, %s) g
+    """, (users,))
+    cursor.execute("""
+        INSERT INTO transactions (user_id, transaction_id, date, description, transaction_type,
+                                  amount, category, payment_method, merchant, balance)
+        SELECT u, t, DATE '2019-01-01' + (t * 1950 / %s), 'Seeded', 'Debit',
+               ((t %% 400) - 300)::numeric, 'Category ' || (t %% 11), 'Debit Card',
+               'Merchant ' || (t %% 97), 1000
+        FROM generate_series(1, %s) u, generate_series(1, %s) t
+    """, (per_user, users, per_user))
+    cursor.execute("""
+        INSERT INTO budgets (budget_id, user_id, monthly_limit, date)
+        SELECT (u - 1) * 24 + m, u, 500 + m, DATE '2022-01-01' + m * 30
+        FROM generate_series(1, %s) u, generate_series(1, 24) m
+    """, (users,))
+    cursor.execute("""
+        INSERT INTO spending_scores (score_id, user_id, score, updated_at)
+        SELECT (u - 1) * 24 + m, u, (m %% 10) + 1, TIMESTAMP '2022-01-01' + m * INTERVAL '30 days'
+        FROM generate_series(1, %s) u, generate_series(1, 24) m
+    """, (users,))
+    rebuild(cursor)
+    cursor.execute("INSERT INTO account_state (user_id) SELECT user_id FROM users")
+    for table in SEEDED_TABLES:
+        cursor.execute(f"ANALYZE {table}")
+
+
+def seq_scans(plan, found=None):
+    """Collect the relations a JSON plan reads with a Seq Scan."""
+    found = [] if found is None else found
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        seq_scans(child, found)
+    return found
+
+
+def check(conn, users=1000, per_user=200):
+    failures = []
+    with conn.cursor() as cursor:
+        seed(cursor, users, per_user)
+        for name, sql, params in PLAN_QUERIES:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scanned = seq_scans(plan[0]["Plan"])
+            print(f"{'FAIL' if scanned else 'ok  '} {name}"
+                  + (f" (seq scan on {', '.join(scanned)})" if scanned else ""))
+            if scanned:
+                failures.append(name)
+    conn.rollback()
+    return failures
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    conn = connect()
+    if conn is None:
+        sys.exit(1)
+    try:
+        failed = check(conn, *args)
+    finally:
+        conn.close()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,181 @@
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+from .config import config, pool_config
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeoutError(PoolError):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool.
+
+    Streamlit runs every browser session in its own script thread, so checkouts
+    block on a condition variable until a connection frees up or `timeout` expires.
+    Idle connections beyond `minconn` are closed after `max_idle` seconds, and a
+    connection that sat idle longer than `health_check_interval` is pinged before
+    it is handed out again.
+    """
+
+    def __init__(self, params, minconn=1, maxconn=10, timeout=10.0, max_idle=300.0, health_check_interval=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: need 0 <= minconn <= maxconn and maxconn >= 1.")
+        self.params = dict(params)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._in_use = 0
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((self._new_connection(), time.monotonic()))
+
+    def _new_connection(self):
+        return psycopg2.connect(**self.params)
+
+    def _size(self):
+        return self._in_use + len(self._idle)
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap_idle(self, now):
+        # Oldest connections sit at the front; keep at least minconn around
+        while len(self._idle) > self.minconn and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.pop(0)
+            self._close_quietly(conn)
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed.")
+                    now = time.monotonic()
+                    self._reap_idle(now)
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._size() < self.maxconn:
+                        self._in_use += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No connection available after {timeout:.1f}s (maxconn={self.maxconn}).")
+                    self._cond.wait(remaining)
+
+            # Health checks and new connections happen outside the lock
+            if candidate is not None:
+                conn, last_used = candidate
+                if self._is_healthy(conn, time.monotonic() - last_used):
+                    return conn
+                self._close_quietly(conn)
+                self._release_slot()
+                continue
+
+            try:
+                return self._new_connection()
+            except Exception:
+                self._release_slot()
+                raise
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def putconn(self, conn, discard=False):
+        if not conn.closed and not discard:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                # Never hand the next caller a half-finished transaction
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed or conn.closed:
+                self._close_quietly(conn)
+            else:
+                now = time.monotonic()
+                self._idle.append((conn, now))
+                self._reap_idle(now)
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "size": self._size(),
+                "maxconn": self.maxconn,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it from database.ini on first use."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(config(), **pool_config())
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,247 @@
+"""Period-aware query builder shared by the transactions fetchers.
+
+Every builder returns an (sql, params) pair ready for cursor.execute. Column and
+bucket names are checked against whitelists because they are interpolated into
+the SQL text; all values go through query parameters.
+"""
+from datetime import date, datetime, timedelta
+
+PERIODS = ("All time", "Last year", "Last month", "Current month", "Year")
+
+TRANSACTION_COLUMNS = ("transaction_id", "date", "description", "transaction_type", "amount",
+                       "category", "payment_method", "merchant", "balance")
+
+MONEY_COLUMNS = ("amount", "balance")
+
+BUCKETS = ("day", "week", "month", "quarter", "year")
+
+
+def _first_of_month(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def resolve_period(period, year=None, today=None):
+    """Map a period label onto a half-open [start, end) date range.
+
+    "All time" resolves to (None, None), meaning no date filter at all.
+    """
+    today = today or datetime.today().date()
+    if isinstance(today, datetime):
+        today = today.date()
+
+    if period == "All time":
+        return None, None
+    if period == "Last year":
+        return date(today.year - 1, 1, 1), date(today.year, 1, 1)
+    if period == "Last month":
+        this_month = _first_of_month(today)
+        return _first_of_month(this_month - timedelta(days=1)), this_month
+    if period == "Current month":
+        return _first_of_month(today), _next_month(today)
+    if period == "Year":
+        if year is None:
+            raise ValueError("A year is required for the 'Year' period.")
+        return date(int(year), 1, 1), date(int(year) + 1, 1, 1)
+    raise ValueError(f"Unknown period {period!r}; expected one of {', '.join(PERIODS)}.")
+
+
+def _where(user_id, period, year, extra_conditions=(), today=None, date_column="date"):
+    start, end = resolve_period(period, year, today)
+    conditions = ["user_id = %s"]
+    params = [user_id]
+    if start is not None:
+        conditions.append(f"{date_column} >= %s AND {date_column} < %s")
+        params.extend([start, end])
+    conditions.extend(extra_conditions)
+    return " AND ".join(conditions), params
+
+
+def _check_columns(columns):
+    unknown = [column for column in columns if column not in TRANSACTION_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown transaction columns: {', '.join(unknown)}")
+
+
+def select_transactions(user_id, period, year=None, columns=TRANSACTION_COLUMNS, order='ASC', today=None,
+                        money_as_cents=False):
+    """Raw rows for a period, projecting only `columns`, ordered by date then id.
+
+    With `money_as_cents` the amount and balance columns come back as integer cents.
+    """
+    _check_columns(columns)
+    if order not in ('ASC', 'DESC'):
+        raise ValueError("Invalid order parameter. Use 'ASC' or 'DESC'.")
+    where, params = _where(user_id, period, year, today=today)
+    projection = [f"({column} * 100)::bigint AS {column}" if money_as_cents and column in MONEY_COLUMNS
+                  else column for column in columns]
+    sql = f"""
+        SELECT {', '.join(projection)}
+        FROM transactions
+        WHERE {where}
+        ORDER BY date {order}, transaction_id {order}
+    """
+    return sql, params
+
+
+def select_transactions_since(user_id, after_id, columns=TRANSACTION_COLUMNS, money_as_cents=False):
+    """Rows inserted after `after_id`, in insertion order; a range scan on the primary key."""
+    _check_columns(columns)
+    projection = [f"({column} * 100)::bigint AS {column}" if money_as_cents and column in MONEY_COLUMNS
+                  else column for column in columns]
+    sql = f"""
+        SELECT {', '.join(projection)}
+        FROM transactions
+        WHERE user_id = %s AND transaction_id > %s
+        ORDER BY transaction_id
+    """
+    return sql, [user_id, after_id]
+
+
+def period_has_transactions(user_id, period, year=None, today=None):
+    """Single-row EXISTS probe; stops at the first matching index entry."""
+    where, params = _where(user_id, period, year, today=today)
+    sql = f"""
+        SELECT EXISTS (
+            SELECT 1
+            FROM transactions
+            WHERE {where}
+        )
+    """
+    return sql, params
+
+
+def sum_by_bucket(user_id, period, year=None, bucket="month", today=None):
+    """Expenses (as positive numbers) and income per date_trunc bucket."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}; expected one of {', '.join(BUCKETS)}.")
+    where, params = _where(user_id, period, year, today=today)
+    sql = f"""
+        SELECT date_trunc('{bucket}', date)::date AS bucket,
+               COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0) AS expenses,
+               COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0) AS income
+        FROM transactions
+        WHERE {where}
+        GROUP BY 1
+        ORDER BY 1
+    """
+    return sql, params
+
+
+def sum_by_category(user_id, period, year=None, expenses_only=True, today=None):
+    """SUM(amount) per category; expenses stay negative, as the pie chart expects."""
+    extra = ["amount < 0"] if expenses_only else []
+    where, params = _where(user_id, period, year, extra, today=today)
+    sql = f"""
+        SELECT category, SUM(amount) AS total_amount
+        FROM transactions
+        WHERE {where}
+        GROUP BY category
+        ORDER BY category ASC
+    """
+    return sql, params
+
+
+# Every period is month aligned, so month buckets and category totals can be
+# answered from the SpendingPatterns rollups instead of raw transactions.
+def rollup_months(user_id, period, year=None, today=None):
+    """Same shape as sum_by_bucket(..., bucket="month"), read from SpendingPatterns."""
+    where, params = _where(user_id, period, year, today=today, date_column="month")
+    sql = f"""
+        SELECT month AS bucket, total_spent AS expenses, total_income AS income
+        FROM SpendingPatterns
+        WHERE {where}
+        ORDER BY month
+    """
+    return sql, params
+
+
+def rollup_categories(user_id, period, year=None, today=None):
+    """Same shape as sum_by_category(), read from SpendingPatternCategories."""
+    where, params = _where(user_id, period, year, ["total_spent > 0"], today=today, date_column="month")
+    sql = f"""
+        SELECT category, -SUM(total_spent) AS total_amount
+        FROM SpendingPatternCategories
+        WHERE {where}
+        GROUP BY category
+        ORDER BY category ASC
+    """
+    return sql, params
+
+
+def rollup_month_spent(user_id, month):
+    sql = """
+        SELECT total_spent
+        FROM SpendingPatterns
+        WHERE user_id = %s AND month = %s
+    """
+    return sql, [user_id, month]
+
+
+def dashboard_snapshot(username, limit=10, today=None):
+    """User info, this and last month's spend and the last `limit` transactions in one row."""
+    this_month = _first_of_month(today or datetime.today().date())
+    last_month = _first_of_month(this_month - timedelta(days=1))
+    sql = """
+        WITH u AS (
+            SELECT user_id FROM users WHERE username = %(username)s
+        ),
+        recent AS (
+            SELECT t.transaction_id, t.date, t.description, t.transaction_type, t.amount,
+                   t.category, t.payment_method, t.merchant, t.balance
+            FROM transactions t JOIN u USING (user_id)
+            ORDER BY t.date DESC, t.transaction_id DESC
+            LIMIT %(limit)s
+        ),
+        spend AS (
+            SELECT sp.month, sp.total_spent
+            FROM SpendingPatterns sp JOIN u USING (user_id)
+            WHERE sp.month IN (%(current_month)s, %(last_month)s)
+        )
+        SELECT u.user_id, a.latest_score, a.balance, a.latest_budget,
+               (SELECT total_spent FROM spend WHERE month = %(current_month)s),
+               (SELECT total_spent FROM spend WHERE month = %(last_month)s),
+               (SELECT COALESCE(json_agg(json_build_array(
+                            date, description, transaction_type, amount,
+                            category, payment_method, merchant, balance)
+                        ORDER BY date DESC, transaction_id DESC), '[]')
+                FROM recent)
+        FROM u
+        LEFT JOIN Account_State a ON a.user_id = u.user_id
+    """
+    return sql, {"username": username, "limit": limit,
+                 "current_month": this_month, "last_month": last_month}
+
+
+def category_merchant_tree(user_id, period, year=None, top_k=5, today=None):
+    """Expense totals per (category, merchant) with each category's top_k merchants
+    kept and the rest folded into one 'Other' node, as positive amounts.
+
+    At most (top_k + 1) rows per category come back, however many transactions
+    the period holds.
+    """
+    where, params = _where(user_id, period, year, ["amount < 0"], today=today)
+    sql = f"""
+        WITH merchants AS (
+            SELECT COALESCE(category, 'Uncategorized') AS category,
+                   COALESCE(merchant, 'Unknown') AS merchant,
+                   SUM(-amount) AS spent
+            FROM transactions
+            WHERE {where}
+            GROUP BY 1, 2
+        ), ranked AS (
+            SELECT category, merchant, spent,
+                   ROW_NUMBER() OVER (PARTITION BY category ORDER BY spent DESC, merchant) AS rank
+            FROM merchants
+        )
+        SELECT category,
+               CASE WHEN rank <= %s THEN merchant ELSE 'Other' END AS merchant,
+               SUM(spent) AS spent
+        FROM ranked
+        GROUP BY 1, 2
+        ORDER BY 1, 3 DESC
+    """
+    return sql, params + [top_k]
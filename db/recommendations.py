@@ -0,0 +1,75 @@
+"""Persistent cache for LLM recommendations (the Recommendation_Cache table).
+
+Keys are computed by the caller (see pages/utils/agent.py); this module only
+stores and expires rows. Lookups are a primary-key read, so a cached answer
+costs one pooled round trip instead of an LLM call.
+"""
+from datetime import datetime
+from .connector import get_connection
+
+
+def get_cached_recommendation(cache_key):
+    """The cached response for `cache_key`, or None if missing or expired."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT response
+                FROM Recommendation_Cache
+                WHERE cache_key = %s AND expires_at > CURRENT_TIMESTAMP
+            """, (cache_key,))
+            row = cursor.fetchone()
+            cursor.close()
+            return row[0] if row else None
+        except Exception as e:
+            print("Error reading recommendation cache:", e)
+            return None
+
+
+def store_recommendation(cache_key, score, model, cache_version, response, ttl):
+    """Insert or refresh a cached response that expires `ttl` (a timedelta) from now."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return False
+
+        try:
+            cursor = conn.cursor()
+            now = datetime.now()
+            cursor.execute("""
+                INSERT INTO Recommendation_Cache (cache_key, score, model, cache_version, response, created_at, expires_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (cache_key) DO UPDATE
+                SET response = EXCLUDED.response,
+                    created_at = EXCLUDED.created_at,
+                    expires_at = EXCLUDED.expires_at
+            """, (cache_key, score, model, cache_version, response, now, now + ttl))
+            conn.commit()
+            cursor.close()
+            return True
+        except Exception as e:
+            print("Error storing recommendation:", e)
+            return False
+
+
+def purge_expired_recommendations():
+    """Delete expired rows; returns how many were removed."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return 0
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM Recommendation_Cache WHERE expires_at <= CURRENT_TIMESTAMP")
+            deleted = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return deleted
+        except Exception as e:
+            print("Error purging recommendations:", e)
+            return 0
@@ -0,0 +1,115 @@
+"""Monthly spending rollups in SpendingPatterns / SpendingPatternCategories.
+
+Every insert path calls apply_transactions() on its own cursor before it
+commits, so the rollups change in the same transaction as the rows they
+summarize. backfill() rebuilds them from scratch when they need repairing:
+
+    python -m db.rollups backfill [user_id]
+"""
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+import psycopg2.extras
+from .connector import connect
+
+UNCATEGORIZED = "Uncategorized"
+
+
+def _month(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def month_deltas(rows):
+    """Fold (date, amount, category) rows into spent/income deltas per month and category."""
+    deltas = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for row_date, amount, category in rows:
+        amount = Decimal(str(amount))
+        key = (_month(row_date), category or UNCATEGORIZED)
+        if amount < 0:
+            deltas[key][0] -= amount
+        else:
+            deltas[key][1] += amount
+    return deltas
+
+
+def apply_transactions(cursor, user_id, rows):
+    """Add freshly inserted (date, amount, category) rows to the user's rollups."""
+    deltas = month_deltas(rows)
+    if not deltas:
+        return
+
+    months = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for (month, _), (spent, income) in deltas.items():
+        months[month][0] += spent
+        months[month][1] += income
+
+    psycopg2.extras.execute_values(cursor, """
+        INSERT INTO SpendingPatterns (user_id, month, total_spent, total_income)
+        VALUES %s
+        ON CONFLICT (user_id, month) DO UPDATE
+        SET total_spent = SpendingPatterns.total_spent + EXCLUDED.total_spent,
+            total_income = SpendingPatterns.total_income + EXCLUDED.total_income
+    """, [(user_id, month, spent, income) for month, (spent, income) in sorted(months.items())])
+
+    psycopg2.extras.execute_values(cursor, """
+        INSERT INTO SpendingPatternCategories (user_id, month, category, total_spent, total_income)
+        VALUES %s
+        ON CONFLICT (user_id, month, category) DO UPDATE
+        SET total_spent = SpendingPatternCategories.total_spent + EXCLUDED.total_spent,
+            total_income = SpendingPatternCategories.total_income + EXCLUDED.total_income
+    """, [(user_id, month, category, spent, income)
+          for (month, category), (spent, income) in sorted(deltas.items())])
+
+
+def rebuild(cursor, user_id=None):
+    """Recompute the rollups from transactions for one user, or everyone, without committing."""
+    user_filter = "WHERE user_id = %s" if user_id is not None else ""
+    params = (user_id,) if user_id is not None else ()
+    cursor.execute(f"DELETE FROM SpendingPatterns {user_filter}", params)
+    cursor.execute(f"DELETE FROM SpendingPatternCategories {user_filter}", params)
+    cursor.execute(f"""
+        INSERT INTO SpendingPatterns (user_id, month, total_spent, total_income)
+        SELECT user_id, date_trunc('month', date)::date,
+               COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+               COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0)
+        FROM transactions
+        {user_filter}
+        GROUP BY 1, 2
+    """, params)
+    months = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO SpendingPatternCategories (user_id, month, category, total_spent, total_income)
+        SELECT user_id, date_trunc('month', date)::date, COALESCE(category, %s),
+               COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+               COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0)
+        FROM transactions
+        {user_filter}
+        GROUP BY 1, 2, 3
+    """, (UNCATEGORIZED,) + params)
+    return months
+
+
+def backfill(conn, user_id=None):
+    with conn.cursor() as cursor:
+        months = rebuild(cursor, user_id)
+    conn.commit()
+    return months
+
+
+if __name__ == "__main__":
+    if not sys.argv[1:] or sys.argv[1] != "backfill":
+        print("Usage: python -m db.rollups backfill [user_id]")
+        sys.exit(1)
+    conn = connect()
+    if conn is None:
+        sys.exit(1)
+    try:
+        target = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        print(f"Rebuilt {backfill(conn, target)} monthly rollups.")
+    finally:
+        conn.close()
@@ -45,4 +45,4 @@ CREATE TABLE Spending_Scores (
     user_id INT REFERENCES Users(user_id) ON DELETE CASCADE,
     score DECIMAL(3,1) DEFAULT 5 NOT NULL,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
@@ -0,0 +1,264 @@
+"""Score_Runs bookkeeping, bulk Spending_Scores writes and scoring inputs."""
+from datetime import datetime
+import pandas as pd
+import psycopg2.extras
+from .connector import get_connection
+from .account_state import record_score
+from .cache import invalidate_user
+
+
+def start_score_run(scorer):
+    """Create a Score_Runs row and return its run_id, or None on failure."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO Score_Runs (scorer)
+                VALUES (%s)
+                RETURNING run_id
+            """, (scorer,))
+            run_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+            return run_id
+        except Exception as e:
+            print("Error starting score run:", e)
+            return None
+
+
+def fetch_score_run(run_id):
+    """(run_id, scorer, completed_at) for an existing run, or None."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT run_id, scorer, completed_at
+                FROM Score_Runs
+                WHERE run_id = %s
+            """, (run_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            return row
+        except Exception as e:
+            print("Error fetching score run:", e)
+            return None
+
+
+def fetch_unscored_users(run_id):
+    """Ids of users with transactions but no score in this run yet, in user_id order."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return []
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT u.user_id
+                FROM Users u
+                WHERE EXISTS (
+                    SELECT 1 FROM transactions t
+                    WHERE t.user_id = u.user_id
+                )
+                  AND NOT EXISTS (
+                    SELECT 1 FROM Spending_Scores s
+                    WHERE s.user_id = u.user_id AND s.run_id = %s
+                )
+                ORDER BY u.user_id
+            """, (run_id,))
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            return user_ids
+        except Exception as e:
+            print("Error fetching users to score:", e)
+            return []
+
+
+def upsert_run_scores(run_id, scores, failed=0):
+    """Write {user_id: score} for a run in one statement and advance Account_State.
+
+    Returns the number of rows written, or None if the batch could not be
+    stored (nothing is committed then, so the users are picked up again on
+    resume).
+    """
+    if not scores and not failed:
+        return 0
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            rows = []
+            if scores:
+                now = datetime.now()
+                rows = psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO Spending_Scores (user_id, score, run_id, updated_at)
+                    VALUES %s
+                    ON CONFLICT (user_id, run_id) DO UPDATE
+                    SET score = EXCLUDED.score,
+                        updated_at = EXCLUDED.updated_at
+                    RETURNING score_id, user_id, score, updated_at
+                """, [(user_id, score, run_id, now) for user_id, score in scores.items()],
+                    page_size=len(scores), fetch=True)
+                for score_id, user_id, score, updated_at in rows:
+                    record_score(cursor, user_id, score_id, score, updated_at)
+            cursor.execute("""
+                UPDATE Score_Runs
+                SET users_scored = users_scored + %s,
+                    users_failed = users_failed + %s
+                WHERE run_id = %s
+            """, (len(rows), failed, run_id))
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            print("Error storing scores:", e)
+            return None
+
+    for user_id in scores:
+        invalidate_user(user_id)
+    return len(rows)
+
+
+def finish_score_run(run_id):
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return False
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE Score_Runs
+                SET completed_at = CURRENT_TIMESTAMP
+                WHERE run_id = %s
+            """, (run_id,))
+            conn.commit()
+            cursor.close()
+            return True
+        except Exception as e:
+            print("Error finishing score run:", e)
+            return False
+
+
+def _user_filter(user_ids, column="user_id"):
+    if user_ids is None:
+        return "TRUE", []
+    return f"{column} = ANY(%s)", [list(user_ids)]
+
+
+def fetch_scoring_inputs(since, user_ids=None):
+    """Aggregates the local scoring engine needs, for all users or just `user_ids`.
+
+    Returns a dict of DataFrames (money as float64), each one set-based query:
+    - monthly: user_id, month, spent, income from SpendingPatterns since `since`
+    - categories: user_id, category, spent from SpendingPatternCategories since `since`
+    - budgets: user_id, date, monthly_limit, every budget (earlier ones still apply)
+    - overdrafts: user_id, overdrafts, transactions since `since` leaving a negative balance
+    Returns None if the queries fail.
+    """
+    where, params = _user_filter(user_ids)
+    queries = {
+        "monthly": (f"""
+            SELECT user_id, month, total_spent AS spent, total_income AS income
+            FROM SpendingPatterns
+            WHERE {where} AND month >= %s
+        """, params + [since]),
+        "categories": (f"""
+            SELECT user_id, category, SUM(total_spent) AS spent
+            FROM SpendingPatternCategories
+            WHERE {where} AND month >= %s
+            GROUP BY user_id, category
+        """, params + [since]),
+        "budgets": (f"""
+            SELECT user_id, date, monthly_limit
+            FROM Budgets
+            WHERE {where}
+        """, params),
+        "overdrafts": (f"""
+            SELECT user_id, COUNT(*) AS overdrafts
+            FROM transactions
+            WHERE {where} AND date >= %s AND balance < 0
+            GROUP BY user_id
+        """, params + [since]),
+    }
+
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            frames = {}
+            for name, (query, query_params) in queries.items():
+                cursor.execute(query, query_params)
+                columns = [column[0] for column in cursor.description]
+                frames[name] = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+            cursor.close()
+        except Exception as e:
+            print("Error fetching scoring inputs:", e)
+            return None
+
+    for column in ("spent", "income", "monthly_limit", "overdrafts"):
+        for df in frames.values():
+            if column in df:
+                df[column] = df[column].astype("float64")
+    for name, column in (("monthly", "month"), ("budgets", "date")):
+        frames[name][column] = pd.to_datetime(frames[name][column])
+    return frames
+
+
+def fetch_latest_run_id(scorer):
+    """Most recent completed run for `scorer`, or None."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return None
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT run_id
+                FROM Score_Runs
+                WHERE scorer = %s AND completed_at IS NOT NULL
+                ORDER BY completed_at DESC
+                LIMIT 1
+            """, (scorer,))
+            row = cursor.fetchone()
+            cursor.close()
+            return row[0] if row else None
+        except Exception as e:
+            print("Error fetching score runs:", e)
+            return None
+
+
+def fetch_run_scores(run_id):
+    """{user_id: score} written by a run."""
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return {}
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT user_id, score
+                FROM Spending_Scores
+                WHERE run_id = %s
+            """, (run_id,))
+            scores = {user_id: float(score) for user_id, score in cursor.fetchall()}
+            cursor.close()
+            return scores
+        except Exception as e:
+            print("Error fetching run scores:", e)
+            return {}
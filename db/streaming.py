@@ -0,0 +1,78 @@
+"""Bounded-memory reads of long transaction histories.
+
+Rows come from a psycopg2 named (server-side) cursor, so Postgres keeps the
+result set and the client only ever holds `itersize` rows. Each chunk is
+turned straight into a typed DataFrame (or folded into an aggregate) instead
+of going through a fetchall() -> list of dicts -> DataFrame round trip.
+"""
+import uuid
+import pandas as pd
+from .connector import get_connection
+from .queries import TRANSACTION_COLUMNS, select_transactions
+
+STREAM_ITERSIZE = 5000
+
+NUMERIC_COLUMNS = ("amount", "balance")
+
+
+def iter_transaction_chunks(user_id, period, year=None, columns=TRANSACTION_COLUMNS, itersize=STREAM_ITERSIZE):
+    """Yield lists of row tuples (in `columns` order), at most `itersize` rows each."""
+    query, params = select_transactions(user_id, period, year, columns)
+    with get_connection() as conn:
+        if conn is None:
+            print("Connection to the database failed.")
+            return
+
+        try:
+            # A named cursor lives on the server; it needs the transaction the
+            # pool rolls back when the connection is returned.
+            cursor = conn.cursor(name=f"transactions_{uuid.uuid4().hex}")
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+        except Exception as e:
+            print("Error streaming transactions:", e)
+
+
+def chunk_frame(rows, columns):
+    """Typed DataFrame for one chunk: datetime64 dates and float64 money columns."""
+    df = pd.DataFrame.from_records(rows, columns=list(columns))
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"])
+    for column in NUMERIC_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("float64")
+    return df
+
+
+def fetch_transactions_frame(user_id, period, year=None, columns=TRANSACTION_COLUMNS, itersize=STREAM_ITERSIZE):
+    """Whole period as one typed DataFrame, built chunk by chunk."""
+    frames = [chunk_frame(rows, columns)
+              for rows in iter_transaction_chunks(user_id, period, year, columns, itersize)]
+    if not frames:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(frames, ignore_index=True)
+
+
+def fetch_daily_balances(user_id, period, year=None, itersize=STREAM_ITERSIZE):
+    """Closing balance per day, aggregated while streaming.
+
+    Rows arrive ordered by (date, transaction_id), so the last row per day in
+    a chunk is that day's closing balance unless the next chunk continues the
+    same day; memory is bounded by the number of days, not transactions.
+    """
+    columns = ("date", "transaction_id", "balance")
+    closing = []
+    for rows in iter_transaction_chunks(user_id, period, year, columns, itersize):
+        df = chunk_frame(rows, columns).drop_duplicates("date", keep="last")
+        if closing and closing[-1]["date"].iloc[-1] == df["date"].iloc[0]:
+            closing[-1] = closing[-1].iloc[:-1]
+        closing.append(df)
+    if not closing:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(closing, ignore_index=True)
@@ -1,23 +1,40 @@
 import streamlit as st
 import streamlit_shadcn_ui as ui
-from db.db_functions import fetch_transactions, fetch_user_info, calculate_user_spending_current_month
+from db.db_functions import fetch_dashboard_snapshot
+from db.loader import load_page_data
+from pages.utils.charts import balance_evolution_figure
+from pages.utils.figure_cache import cached_figure
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
+# Window sizes offered for the balance chart
+CHART_WINDOWS = [10, 25, 50, 100, 250, 500, 1000, 5000]
+
 
 def dashboard():
     username = st.session_state["username"]
-    user_info = fetch_user_info(username)
-    if user_info is None:
+    # Score, balance, budget, month spend and recent transactions in one query;
+    # it still goes through the page loader so its timing is logged like the
+    # other pages'. The chart window comes from the slider further down; its
+    # keyed value is already in session_state on reruns
+    chart_window = st.session_state.get("balance_chart_window", 10)
+    data = load_page_data("Dashboard", {
+        "snapshot": (fetch_dashboard_snapshot, username, max(chart_window, 10)),
+    })
+    snapshot = data.results["snapshot"]
+    if snapshot is None:
         st.error("Failed to fetch user information")
         return
-    user_id = user_info['user_id']
-    spending_score = user_info['spending_score']
-    last_balance = user_info['balance']
-    budget = user_info['latest_budget']
-    last_ten_transactions = fetch_transactions(username, 10)
-    current_month_spending = calculate_user_spending_current_month(user_id)
+    spending_score = snapshot['spending_score']
+    last_balance = snapshot['balance']
+    budget = snapshot['latest_budget']
+    chart_transactions = snapshot['transactions'][:chart_window]
+    last_ten_transactions = snapshot['transactions'][:10]
+    current_month_spending = snapshot['current_month_spending']
+    if snapshot['spending_change_pct'] is None:
+        spending_change = "No spending recorded last month"
+    else:
+        spending_change = f"{snapshot['spending_change_pct']:+.1f}% spending vs last month"
     today = datetime.today()
     first_day_current_month = today.replace(day=1)
     last_day_current_month = (today.replace(
@@ -38,7 +55,7 @@ def dashboard():
     card_cols = st.columns(3)
     with card_cols[0]:
         ui.metric_card(title="Spending Score", content=f"{spending_score}/10.0",
-                       description="+5.5% from last month", key="card1")
+                       description=spending_change, key="card1")
     with card_cols[1]:
         ui.metric_card(title=f"Budget Used ({first_day_str} - {last_day_str})", content=f"${current_month_spending:.2f}/${budget}",
                        description="#change your budget on the Get Started tab", key="card2")
@@ -84,53 +101,19 @@ def dashboard():
             st.dataframe(styled_df, hide_index=True,
                          use_container_width=True)
 
-        # RIGHT COLUMN / LAST 10 TRANSACTIONS GRAPH
-        # Create an index column for transaction sequence
-        df_inverted = df.iloc[::-1].reset_index(drop=True)
-        df_inverted['Transaction Number'] = range(1, len(df_inverted) + 1)
-
-        # Plot the chart using Plotly
-        fig = go.Figure()
-
-        # Add line segments based on balance direction
-        for i in range(1, len(df_inverted)):
-            color = 'green' if df_inverted['Balance'][i] >= df_inverted['Balance'][i-1] else 'red'
-            fig.add_trace(go.Scatter(
-                x=df_inverted['Transaction Number'].iloc[i-1:i+1],
-                y=df_inverted['Balance'].iloc[i-1:i+1],
-                mode='lines+markers',
-                line=dict(color=color),
-                marker=dict(color=color),
-                # Use the transaction's category name as the trace name
-                name=df_inverted['Category'][i]
-            ))
-
-        # Annotate each transaction with the balance value
-        for i, balance in enumerate(df_inverted['Balance']):
-            fig.add_annotation(
-                x=df_inverted['Transaction Number'][i],
-                y=balance,
-                text=f"${balance:.2f}",
-                showarrow=True,
-                arrowhead=2,
-                ax=0,
-                ay=-10,
-                font=dict(color='white')
-            )
-
-        # Set labels and title
-        fig.update_layout(
-            title='Balance Evolution Over Last 10 Transactions',
-            xaxis_title='Transaction Number',
-            yaxis_title='Balance',
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=False)
-        )
+        # RIGHT COLUMN / BALANCE GRAPH OVER THE LAST N TRANSACTIONS
+        # Oldest first; the builder uses a fixed number of traces for any N
+        def build_chart():
+            chart_df = pd.DataFrame(chart_transactions, columns=columns).iloc[::-1]
+            return balance_evolution_figure(
+                chart_df['Balance'], chart_df['Category'],
+                title=f'Balance Evolution Over Last {len(chart_df)} Transactions')
+
+        fig = cached_figure(snapshot['user_id'], 'balance_evolution', build_chart, chart_window)
 
         with transaction_graph[1]:
+            st.select_slider("Transactions to chart", options=CHART_WINDOWS,
+                             value=10, key="balance_chart_window")
             st.plotly_chart(fig, use_container_width=True)
     else:
         st.write("No transactions found.")
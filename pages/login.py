@@ -3,7 +3,7 @@ import streamlit_authenticator as stauth
 import yaml
 from yaml.loader import SafeLoader
 import psycopg2
-from db.config import config
+from db.connector import get_connection
 
 # Function to insert new user into the database
 
@@ -11,22 +11,23 @@ from db.config import config
 def insert_new_user(name, email, username):
     """Insert a new user into the database with name, email, and username."""
     try:
-        params = config()
-        connection = psycopg2.connect(**params)
-        cursor = connection.cursor()
+        with get_connection() as connection:
+            if connection is None:
+                st.error("Error inserting new user: database connection failed")
+                return
+            cursor = connection.cursor()
 
-        # Insert the new user with username
-        insert_query = """
-        INSERT INTO Users (name, email, username)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (email) DO NOTHING;
-        """
-        cursor.execute(insert_query, (name, email, username))
-        connection.commit()
+            # Insert the new user with username
+            insert_query = """
+            INSERT INTO Users (name, email, username)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (email) DO NOTHING;
+            """
+            cursor.execute(insert_query, (name, email, username))
+            connection.commit()
 
-        cursor.close()
-        connection.close()
-        print(f"Added User {name} Correctly")
+            cursor.close()
+            print(f"Added User {name} Correctly")
     except (Exception, psycopg2.DatabaseError) as error:
         st.error(f"Error inserting new user: {error}")
 
@@ -2,13 +2,43 @@ import streamlit as st
 from streamlit_navigation_bar import st_navbar
 from streamlit_extras.metric_cards import style_metric_cards
 import pandas as pd
-from pages.utils.agent import ScoreAgent
+from pages.utils.agent import get_score_agent, fallback_recommendation
 from db.db_functions import fetch_user_info, fetch_spending_scores
+from db.config import scoring_config
+from scoring.engine import LocalScorer
+from pages.utils.figure_cache import FigureCache
+from db.cache import data_version
+from datetime import date
 import plotly.graph_objects as go
 import streamlit_shadcn_ui as ui
 import math as mt
 # from pages.util.score_details import ScoreDetails
 
+# Local engine scores, keyed like the figures so a write for the user drops them
+local_scores = FigureCache(maxsize=1024)
+
+
+def cached_local_score(user_id):
+    # The engine's window is relative to the current month
+    key = (user_id, date.today().replace(day=1), data_version(user_id))
+    return local_scores.get_or_build(key, lambda: LocalScorer().score(user_id))
+
+
+def with_prefix(prefix, chunks):
+    # Prefix the first streamed chunk, so an empty stream still writes nothing
+    for index, chunk in enumerate(chunks):
+        yield prefix + chunk if index == 0 else chunk
+
+
+def show_recommendation(job, prefix=""):
+    # Follow the background job until it finishes or RECOMMENDATION_TIMEOUT
+    # passes; it keeps running either way and its answer lands in the cache
+    text = st.write_stream(with_prefix(prefix, job.follow()))
+    if not text:
+        st.write(prefix + fallback_recommendation(job.score))
+    if not job.done:
+        st.caption("Your personalized recommendation is still being generated and will be ready next time you open this page.")
+
 
 def spending_score():
     st.title("Spending Analyzer")
@@ -16,25 +46,34 @@ def spending_score():
     st.divider()
 
     # -------- Metric Retrieval -------- #
-    score_agent = ScoreAgent()
+    # Shared agent; recommendations are answered from Recommendation_Cache
+    # when present (`python -m pages.utils.agent warm` precomputes all scores)
+    score_agent = get_score_agent()
     username = st.session_state['username']
     user_info = fetch_user_info(username)
     spending_score = user_info['spending_score']
     user_id = user_info['user_id']
+    # [scoring] scorer = local in database.ini computes the score on the fly
+    # with the deterministic engine instead of reading the last stored one
+    if scoring_config()["scorer"] == "local":
+        local_score = cached_local_score(user_id)
+        if local_score is not None:
+            spending_score = local_score
 
     # Determine label based on spending score
     if spending_score <= 3:
         label = "Good! You are earning +1% cashback on groceries."
-    elif 4 >= spending_score <= 6:
+    elif spending_score <= 6:
         label = "Great! You are earning +1% cashback on groceries and online purchases."
-    elif 7 >= spending_score <= 8:
+    elif spending_score <= 8:
         label = "Nice! You are earning +2% cashback on linked subscription rewards."
-    elif 9 >= spending_score <= 10:
+    else:
         label = "Awesome score! You are earning +1% extra cashback on top of your current cashback reward."
 
     spending_score = float(spending_score)
-    # Fetch recommendation based on the given score
-    actual_recommendation = score_agent.recommendation(score=spending_score)
+    # Generation starts now on a background thread and runs while the tiles
+    # below render; reruns join the job already in flight for this score
+    recommendation_job = score_agent.start_recommendation(spending_score)
 
     def display_top_tiles(user_id):
         col1, col2 = st.columns(2)
@@ -161,8 +200,10 @@ def spending_score():
     st.write(
         "Keep in mind that the recommendation is based on your *current* Spending Score.")
 
+    # Streamed: the text appears token by token instead of after the whole
+    # completion, and everything above is already on the page
     with st.chat_message("assistant"):
-        st.write(actual_recommendation)
+        show_recommendation(recommendation_job)
 
     # Interactive feature
     st.divider()
@@ -170,10 +211,17 @@ def spending_score():
     st.write("In this section, you can ask our AI Agent to simulate recommendations for a specific spending score.")
     user_input = st.text_input("Enter your Spending Score: ", None)
     if user_input is not None:
-        ht_recommendation = score_agent.recommendation(score=float(user_input))
-
+        try:
+            hypothetical_score = float(user_input)
+        except ValueError:
+            st.error("Please enter a number between 0 and 10.")
+            return
+        if not 0 <= hypothetical_score <= 10:
+            st.error("Please enter a number between 0 and 10.")
+            return
         with st.chat_message("assistant"):
-            st.write(f"Using a hypothetical score, {ht_recommendation}")
+            show_recommendation(score_agent.start_recommendation(hypothetical_score),
+                                prefix="Using a hypothetical score, ")
 
 
 if __name__ == "__main__":
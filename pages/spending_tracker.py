@@ -5,64 +5,238 @@ import pandas as pd
 import matplotlib as mt
 from plotly import graph_objects as go
 from .misc.descriptions import pieChartDescription
-import decimal
-from db.db_functions import insert_transaction, fetch_user_info, calculate_user_spending_current_month, fetch_user_transactions_current_month, fetch_transactions_by_period, fetch_transactions_for_candles, fetch_expenses_by_category
-from datetime import datetime, timedelta
+from db.loader import load_page_data
+from pages.utils.figure_cache import cached_figure
+from pages.utils.transaction_store import transaction_store
+from pages.utils.downsample import DEFAULT_POINTS, downsample_indices
+from db.db_functions import insert_transactions_batch, fetch_user_info, calculate_user_spending_current_month, fetch_budget_hierarchy, fetch_period_buckets, fetch_expenses_by_category, has_transactions_in_period
+from datetime import date, datetime, timedelta
 import uuid
 
+# Merchants shown per category in the budget sunburst; the rest become "Other"
+TOP_MERCHANTS = 5
 
-def displayPlot(user_id):
-    transactions = fetch_user_transactions_current_month(user_id)
-    username = st.session_state['username']
-    user_info = fetch_user_info(username)
-    user_id = user_info['user_id']
-    last_balance = user_info['balance']
-    budget = user_info['latest_budget']
-    categories = {}
-    total_spent = 0
 
-    for transaction in transactions:
-        category = transaction['category']
-        amount = transaction['amount']
-        if amount < 0:  # Only consider negative amounts
-            total_spent += abs(amount)
-            if category in categories:
-                categories[category] += abs(amount)
-            else:
-                categories[category] = abs(amount)
+def budget_sunburst_figure(budget, nodes):
+    """Budget -> category -> merchant sunburst from the aggregated expense nodes."""
+    categories = {}
+    for node in nodes:
+        categories[node['category']] = categories.get(node['category'], 0) + node['spent']
 
-    # Filter out categories with a positive total amount
-    categories = {k: v for k, v in categories.items() if v > 0}
+    if not categories:
+        return None
 
+    total_spent = sum(categories.values())
     remaining_budget = budget - total_spent
-
-    if not categories:
+    # ids keep merchants (and the per-category "Other") unique across categories
+    ids = ["Budget"] + [f"Budget/{category}" for category in categories] + ["Remaining Budget"]
+    labels = ["Budget"] + list(categories.keys()) + ["Remaining Budget"]
+    parents = [""] + ["Budget"] * len(categories) + ["Budget"]
+    values = [budget] + list(categories.values()) + [remaining_budget]
+    for node in nodes:
+        ids.append(f"Budget/{node['category']}/{node['merchant']}")
+        labels.append(node['merchant'])
+        parents.append(f"Budget/{node['category']}")
+        values.append(node['spent'])
+
+    fig = go.Figure(go.Sunburst(
+        ids=ids,
+        labels=labels,
+        parents=parents,
+        values=values,
+        branchvalues="total"
+    ))
+    fig.update_layout(margin=dict(t=0, l=0, r=0, b=0))
+    return fig
+
+
+def displayPlot(user_info, nodes):
+    fig = cached_figure(
+        user_info['user_id'], 'budget_sunburst',
+        lambda: budget_sunburst_figure(user_info['latest_budget'], nodes),
+        date.today().replace(day=1))
+
+    if fig is None:
         st.markdown(
             """
             <h4 style='text-align: center;font-family: consolas; vertical-align:middle;'>It looks like you haven't made any transactions this month. Time to start spending wisely!</h3>""", unsafe_allow_html=True)
     else:
-        labels = ["Budget"] + list(categories.keys()) + ["Remaining Budget"]
-        parents = [""] + ["Budget"] * len(categories) + ["Budget"]
-        values = [budget] + list(categories.values()) + [remaining_budget]
-
-        fig = go.Figure(go.Sunburst(
-            labels=labels,
-            parents=parents,
-            values=values,
-            branchvalues="total"
-        ))
-        fig.update_layout(margin=dict(t=0, l=0, r=0, b=0))
         st.plotly_chart(fig, theme="streamlit")
 
 
+def transactions_chart_figure(df, period):
+    if df.empty:
+        return None
+
+    if period in ['Last year', 'Year']:
+        x_axis = 'month'
+    elif period == 'Last month':
+        x_axis = 'day'
+    else:
+        x_axis = 'quarter'
+
+    if len(df) > DEFAULT_POINTS:
+        # Years of daily balances are more points than the chart has pixels;
+        # LTTB keeps the shape and the highest and lowest balance
+        keep = downsample_indices(
+            df['date'].to_numpy().astype('int64'), df['balance'].to_numpy(), DEFAULT_POINTS)
+        df = df.iloc[keep]
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=df['date'],
+        y=df['balance'],
+        mode='lines+markers',
+        fill='tozeroy',  # Fill the area under the line
+        marker=dict(color='cyan'),
+        line=dict(color='cyan')
+    ))
+
+    fig.update_layout(
+        title='Transactions Over Time',
+        xaxis_title=x_axis.capitalize(),
+        yaxis_title='Balance',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False),
+        width=1200,  # Set the width of the graph
+        height=600  # Set the height of the graph
+    )
+    return fig
+
+
+def histogram_bucket(period):
+    return 'month' if period in ['Year', 'All time'] else 'day'
+
+
+def load_histogram_buckets(user_id, period, year):
+    # Buckets are summed in Postgres; only one row per month/day comes back
+    return pd.DataFrame(fetch_period_buckets(
+        user_id, period, year, histogram_bucket(period)))
+
+
+def histogram_figure(df_buckets, period):
+    if histogram_bucket(period) == 'month':
+        x_axis, bucket_format = 'month', '%Y-%m'
+    else:
+        x_axis, bucket_format = 'day', '%Y-%m-%d'
+    if df_buckets.empty:
+        return None
+    df_buckets[x_axis] = pd.to_datetime(
+        df_buckets['bucket']).dt.strftime(bucket_format)
+    df_expenses = df_buckets[df_buckets['expenses'] > 0].rename(
+        columns={'expenses': 'amount'})
+    df_income = df_buckets[df_buckets['income'] > 0].rename(
+        columns={'income': 'amount'})
+
+    # Convert amounts to float for y-axis range calculation
+    max_expense = float(df_expenses['amount'].max())
+    max_income = float(df_income['amount'].max())
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(
+        x=df_expenses[x_axis].astype(str),
+        y=df_expenses['amount'],
+        name='Expense',
+        marker_color='red'
+    ))
+
+    fig.add_trace(go.Bar(
+        x=df_income[x_axis].astype(str),
+        y=df_income['amount'],
+        name='Income',
+        marker_color='green'
+    ))
+
+    fig.update_layout(
+        title='Transactions Candle',
+        xaxis_title=x_axis.capitalize(),
+        yaxis_title='Amount',
+        barmode='group',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False),
+        # Ensure y-axis starts at 0
+        yaxis_range=[0, max(max_expense, max_income) * 1.1],
+        width=1200,  # Set the width of the graph
+        height=600  # Set the height of the graph
+    )
+    return fig
+
+
+def load_category_expenses(user_id, period, year):
+    return pd.DataFrame(fetch_expenses_by_category(user_id, period, year))
+
+
+def category_pie_figure(df_expenses, period):
+    if df_expenses.empty:
+        return None
+
+    # Ensure the amounts are positive for the pie chart
+    df_expenses['total_amount'] = df_expenses['total_amount'].abs()
+
+    fig = go.Figure(go.Pie(
+        labels=df_expenses['category'],
+        values=df_expenses['total_amount'],
+        hole=.3
+    ))
+
+    fig.update_layout(
+        title='Transactions Pie Chart',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        width=1200,  # Set the width of the graph
+        height=600  # Set the height of the graph
+    )
+    return fig
+
+
+def load_daily_balances(user_id, period, year):
+    return transaction_store(user_id).daily_balances(period, year)
+
+
+# Each analyzer tab: (data provider, figure builder). A provider runs only the
+# query its own chart needs, and only when that tab is shown.
+ANALYZER_VIEWS = {
+    # Closing balance per day from the user's delta-synced store
+    'Transactions Chart': (load_daily_balances, transactions_chart_figure),
+    'Expenses/Income Histogram': (load_histogram_buckets, histogram_figure),
+    'Categorized Expenses': (load_category_expenses, category_pie_figure),
+}
+
+
+def analyzer_figure(user_id, view, period, year):
+    # Empty periods are answered by an EXISTS probe instead of the view's query
+    if not has_transactions_in_period(user_id, period, year):
+        return None
+    load, build = ANALYZER_VIEWS[view]
+    return build(load(user_id, period, year), period)
+
+
 def spending_tracker():
     username = st.session_state['username']
+    user_id = fetch_user_info(username)['user_id']
+    # Pick up rows inserted since the last rerun, from this process or any
+    # other; if there are any, the sync drops the cached user info and figures
+    transaction_store(user_id)
     user_info = fetch_user_info(username)
-    user_id = user_info['user_id']
-    last_balance = user_info['balance']
     budget = user_info['latest_budget']
     st.title("Spending Tracker")
-    current_month_spending = calculate_user_spending_current_month(user_id)
+    data = load_page_data("Spending Tracker", {
+        "current_month_spending": (calculate_user_spending_current_month, user_id),
+        # Category/merchant totals only; the payload no longer grows with the
+        # number of transactions in the month
+        "budget_hierarchy": (fetch_budget_hierarchy, user_id, TOP_MERCHANTS),
+    })
+    current_month_spending = data.results["current_month_spending"] or 0.0
+    budget_hierarchy = data.results["budget_hierarchy"] or []
     data_editor = pd.DataFrame(columns=[
                                'date', 'description', 'transaction_type', 'amount', 'category', 'payment_method', 'merchant'])
     transaction_type = ['Credit', 'Debit', 'Transfer']
@@ -83,7 +257,7 @@ def spending_tracker():
     cols = st.columns(2)
 
     with cols[1]:
-        displayPlot(user_id)
+        displayPlot(user_info, budget_hierarchy)
 
     # totalSpent = 90  # db.calculate_user_spending_current_month()
     # totalBudget = 100  # find the budget from database
@@ -131,33 +305,19 @@ def spending_tracker():
         if user_id is None:
             st.error("Failed to fetch user ID.")
         else:
-            if last_balance is None:
-                st.error("Failed to fetch last balance.")
-            else:
-                for index, row in add_transaction_table.iterrows():
-                    date = row['date']
-                    description = row['description']
-                    transaction_type = row['transaction_type']
-                    amount = decimal.Decimal(row['amount'])
-                    category = row['category']
-                    payment_method = row['payment_method']
-                    merchant = row['merchant']
-
-                    # Calculate the new balance
-                    new_balance = last_balance + amount
-
-                    # Insert the transaction into the database
-                    success = insert_transaction(
-                        user_id, date, description, transaction_type, amount, category, payment_method, merchant, new_balance)
-                    if success:
-                        st.success(f"Transaction {index + 1} added successfully.")
-                        # Update last_balance for the next transaction
-                        last_balance = new_balance
-                    else:
-                        st.error(f"Failed to add transaction {index + 1}.")
-
-                # Clear the input in the data editor by updating the key
-                update_data_editor()
+            # One round trip and one transaction for the whole edited table;
+            # running balances are assigned by the database under a row lock
+            results = insert_transactions_batch(user_id, add_transaction_table)
+            # Fold the new rows in before the chart below is rebuilt
+            transaction_store(user_id)
+            for index, success, message in results:
+                if success:
+                    st.success(f"Transaction {index + 1} added successfully.")
+                else:
+                    st.error(f"Failed to add transaction {index + 1}: {message}")
+
+            # Clear the input in the data editor by updating the key
+            update_data_editor()
 
     st.divider()
 
@@ -182,142 +342,14 @@ def spending_tracker():
         year = st.slider('Select year', min_value=2000,
                          max_value=today.year, value=today.year)
 
-    transactions = fetch_transactions_by_period(user_id, period, year)
-
-    if transactions:
-        df = pd.DataFrame(transactions)
-        df['date'] = pd.to_datetime(df['date'])
-
-        if period == 'Last year':
-            df['month'] = df['date'].dt.to_period('M').astype(str)
-            x_axis = 'month'
-        elif period == 'Last month':
-            df['day'] = df['date'].dt.to_period('D').astype(str)
-            x_axis = 'day'
-        elif period == 'Year':
-            df['month'] = df['date'].dt.to_period('M').astype(str)
-            x_axis = 'month'
-        else:
-            df['quarter'] = df['date'].dt.to_period('Q').astype(str)
-            x_axis = 'quarter'
-
-        # Summarize transactions per day
-        df = df.sort_values(by=['date', 'transaction_id']).groupby(
-            'date').last().reset_index()
-
-        if graph_type == 'Transactions Chart':
-            fig = go.Figure()
-
-            fig.add_trace(go.Scatter(
-                x=df['date'],
-                y=df['balance'],
-                mode='lines+markers',
-                fill='tozeroy',  # Fill the area under the line
-                marker=dict(color='cyan'),
-                line=dict(color='cyan')
-            ))
-
-            fig.update_layout(
-                title='Transactions Over Time',
-                xaxis_title=x_axis.capitalize(),
-                yaxis_title='Balance',
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                xaxis=dict(showgrid=False),
-                yaxis=dict(showgrid=False),
-                width=1200,  # Set the width of the graph
-                height=600  # Set the height of the graph
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-        elif graph_type == 'Expenses/Income Histogram':
-            transactions_candle = fetch_transactions_for_candles(
-                user_id, period, year)
-            df_candle = pd.DataFrame(transactions_candle)
-            df_candle['date'] = pd.to_datetime(df_candle['date'])
-
-            if period in ['Year', 'All time']:
-                df_candle['month'] = df_candle['date'].dt.to_period('M')
-                df_expenses = df_candle[df_candle['amount'] < 0].groupby(
-                    'month')['amount'].sum().reset_index()
-                df_income = df_candle[df_candle['amount'] > 0].groupby(
-                    'month')['amount'].sum().reset_index()
-                x_axis = 'month'
-            else:
-                df_candle['day'] = df_candle['date'].dt.to_period('D')
-                df_expenses = df_candle[df_candle['amount'] < 0].groupby(
-                    'day')['amount'].sum().reset_index()
-                df_income = df_candle[df_candle['amount'] > 0].groupby(
-                    'day')['amount'].sum().reset_index()
-                x_axis = 'day'
-
-            # Convert expenses to positive values for comparison
-            df_expenses['amount'] = df_expenses['amount'].abs()
-
-            # Convert amounts to float for y-axis range calculation
-            max_expense = float(df_expenses['amount'].max())
-            max_income = float(df_income['amount'].max())
-
-            fig = go.Figure()
-
-            fig.add_trace(go.Bar(
-                x=df_expenses[x_axis].astype(str),
-                y=df_expenses['amount'],
-                name='Expense',
-                marker_color='red'
-            ))
-
-            fig.add_trace(go.Bar(
-                x=df_income[x_axis].astype(str),
-                y=df_income['amount'],
-                name='Income',
-                marker_color='green'
-            ))
-
-            fig.update_layout(
-                title='Transactions Candle',
-                xaxis_title=x_axis.capitalize(),
-                yaxis_title='Amount',
-                barmode='group',
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                xaxis=dict(showgrid=False),
-                yaxis=dict(showgrid=False),
-                # Ensure y-axis starts at 0
-                yaxis_range=[0, max(max_expense, max_income) * 1.1],
-                width=1200,  # Set the width of the graph
-                height=600  # Set the height of the graph
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-        elif graph_type == 'Categorized Expenses':
-            expenses_by_category = fetch_expenses_by_category(
-                user_id, period, year)
-            df_expenses = pd.DataFrame(expenses_by_category)
-
-            # Ensure the amounts are positive for the pie chart
-            df_expenses['total_amount'] = df_expenses['total_amount'].abs()
-
-            fig = go.Figure(go.Pie(
-                labels=df_expenses['category'],
-                values=df_expenses['total_amount'],
-                hole=.3
-            ))
-
-            fig.update_layout(
-                title='Transactions Pie Chart',
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                width=1200,  # Set the width of the graph
-                height=600  # Set the height of the graph
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
+    # Figures are memoized per (view, period, year, day) and the user's data
+    # version, so reruns that only touch other widgets skip the queries and
+    # the DataFrame work; any insert for this user bumps the version
+    fig = cached_figure(user_id, graph_type,
+                        lambda: analyzer_figure(user_id, graph_type, period, year),
+                        period, year, today.date())
 
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
     else:
         st.write("No transactions found for the selected period.")
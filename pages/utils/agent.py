@@ -1,65 +1,359 @@
-from .constants import RECOMENDATION_PROMPT, SCORE_PROMPT
+from .constants import RECOMENDATION_PROMPT, SCORE_PROMPT, FALLBACK_RECOMMENDATIONS
 from dotenv import load_dotenv
+import hashlib
 import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from groq import Groq
-import pandas as pd
+from db.recommendations import get_cached_recommendation, store_recommendation
+from .history_summary import estimate_tokens, summarize_transactions
+
+MODEL_NAME = "llama-3.1-70b-versatile"
+
+# Bump to invalidate every cached recommendation (e.g. after changing how the
+# prompt is rendered in a way the template text doesn't capture)
+RECOMMENDATION_CACHE_VERSION = 1
+RECOMMENDATION_TTL = timedelta(days=30)
+
+# Spending_Scores.score is DECIMAL(3, 1) between 0.0 and 10.0: 101 possible values
+SCORE_RANGE = [step / 10 for step in range(0, 101)]
+
+SCORE_ANSWER = re.compile(r"\b(10|[1-9])\b")
+
+# Generation timings kept per agent for inspection
+METRICS_HISTORY = 100
+
+# Background generation: concurrent LLM calls, and how long a page waits for
+# one before showing the templated fallback (generation carries on and lands
+# in the cache either way)
+RECOMMENDATION_WORKERS = 4
+RECOMMENDATION_TIMEOUT = 30.0
+
+
+def fallback_recommendation(score) -> str:
+    """Templated recommendation for the score's reward tier; needs no LLM."""
+    score = round(float(score), 1)
+    for upper, template in sorted(FALLBACK_RECOMMENDATIONS.items()):
+        if score <= upper:
+            return template.format(score=score)
+    return FALLBACK_RECOMMENDATIONS[max(FALLBACK_RECOMMENDATIONS)].format(score=score)
+
+
+class RecommendationJob:
+    """Text of one recommendation as it is generated on a background thread.
+
+    Any number of readers can follow() the same job; each gets everything
+    produced so far and then the rest as it arrives.
+    """
+
+    def __init__(self, score):
+        self.score = score
+        self.parts = []
+        self.done = False
+        self.completed = False
+        self._condition = threading.Condition()
+
+    def append(self, part):
+        with self._condition:
+            self.parts.append(part)
+            self._condition.notify_all()
+
+    def finish(self, completed):
+        with self._condition:
+            self.done = True
+            self.completed = completed
+            self._condition.notify_all()
+
+    @property
+    def text(self):
+        with self._condition:
+            return "".join(self.parts)
+
+    def follow(self, timeout=RECOMMENDATION_TIMEOUT):
+        """Yield the text in pieces until the job is done or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        index = 0
+        while True:
+            with self._condition:
+                while index == len(self.parts) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                new_parts = self.parts[index:]
+                index = len(self.parts)
+                finished = self.done
+            yield from new_parts
+            if finished:
+                return
+
+
+def token_counts(usage, prompt):
+    """prompt_tokens / completion_tokens from an API usage object.
+
+    Without usage (an interrupted stream, or a server that doesn't report it)
+    the prompt count is estimated and `estimated` is set.
+    """
+    if usage is None:
+        return dict(prompt_tokens=estimate_tokens(prompt), completion_tokens=None, estimated=True)
+    return dict(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens,
+                estimated=False)
 
 
 class ScoreAgent:
-    def __init__(self) -> None:
+    def __init__(self, client=None) -> None:
         self.rec_prompt = RECOMENDATION_PROMPT
         self.score_prompt = SCORE_PROMPT
-        load_dotenv()  # load vars defined in the .env file to global env
-        key = os.getenv('API_KEY')  # get env variables
-        # connect to the API endpoint
-        self.client = Groq(api_key=key)
+        if client is None:
+            load_dotenv()  # load vars defined in the .env file to global env
+            key = os.getenv('API_KEY')  # get env variables
+            # connect to the API endpoint
+            client = Groq(api_key=key)
+        self.client = client
+        # dicts with time_to_first_token / total_time in seconds and
+        # prompt_tokens / completion_tokens, newest last
+        self.metrics = deque(maxlen=METRICS_HISTORY)
+
+    def _completion_args(self, prompt_template, stream):
+        return dict(
+            model=MODEL_NAME,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt_template
+                }
+            ],
+            temperature=0.9,
+            max_tokens=1024,
+            top_p=1,
+            stream=stream,
+            stop=None,
+            seed=123
+        )
 
     def generate(self, client, prompt_template: str):
         try:
             # generate responses
+            started = time.perf_counter()
             completion = client.chat.completions.create(
-                model="llama-3.1-70b-versatile",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt_template
-                    }
-                ],
-                temperature=0.9,
-                max_tokens=1024,
-                top_p=1,
-                stream=False,
-                stop=None,
-                seed=123
-            )
+                **self._completion_args(prompt_template, stream=False))
+            elapsed = time.perf_counter() - started
+            metrics = dict(streamed=False, completed=True,
+                           time_to_first_token=elapsed, total_time=elapsed)
+            metrics.update(token_counts(completion.usage, prompt_template))
+            self._record(metrics)
             return completion
         except Exception as e:
             print(f"Ops! Failed to generate response from LLM: {e}")
             return None
 
-    def recommendation(self, score=0) -> str:
+    def generate_stream(self, client, prompt_template: str, metrics=None):
+        """Yield content deltas as they arrive.
+
+        When the stream ends (finished, failed or abandoned) `metrics`, if
+        given, is filled with time_to_first_token and total_time in seconds,
+        the number of content chunks, token counts and whether the completion
+        finished.
+        """
+        metrics = {} if metrics is None else metrics
+        metrics.update(streamed=True, completed=False, time_to_first_token=None, chunks=0)
+        usage = None
+        started = time.perf_counter()
+        try:
+            stream = client.chat.completions.create(
+                **self._completion_args(prompt_template, stream=True))
+            for chunk in stream:
+                # Groq reports usage on the last chunk under x_groq
+                usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) \
+                    or getattr(chunk, 'usage', None) or usage
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if metrics['time_to_first_token'] is None:
+                    metrics['time_to_first_token'] = time.perf_counter() - started
+                metrics['chunks'] += 1
+                yield content
+            metrics['completed'] = True
+        except Exception as e:
+            print(f"Ops! Failed to stream response from LLM: {e}")
+        finally:
+            metrics['total_time'] = time.perf_counter() - started
+            metrics.update(token_counts(usage, prompt_template))
+            self._record(metrics)
+
+    def _record(self, metrics):
+        self.metrics.append(metrics)
+        first = metrics['time_to_first_token']
+        print(f"LLM {'stream' if metrics['streamed'] else 'call'}"
+              f"{'' if metrics['completed'] else ' (incomplete)'}: "
+              f"first token {'n/a' if first is None else f'{first * 1000:.0f} ms'}, "
+              f"total {metrics['total_time'] * 1000:.0f} ms, "
+              f"{metrics['prompt_tokens']}{'~' if metrics['estimated'] else ''} prompt tokens, "
+              f"{metrics['completion_tokens'] if metrics['completion_tokens'] is not None else 'n/a'} completion tokens")
+
+    def recommendation_prompt(self, score) -> str:
         # define the prompt with the instructions
         # here is where the prompt engineering comes to play, I have created a template but feel free to change it
-        prompt_template = f'''<s>[INST]{self.rec_prompt}\n
+        return f'''<s>[INST]{self.rec_prompt}\n
         Your answers must be short, friendly yet professional, and helpful.
         Please give up to five financial recommendations based on the student's spending score of: {score}[/INST]
         '''
 
+    def recommendation_key(self, score) -> str:
+        """Cache key: the prompt already embeds the score and the template text."""
+        material = f"{RECOMMENDATION_CACHE_VERSION}\n{MODEL_NAME}\n{self.recommendation_prompt(score)}"
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def recommendation(self, score=0, use_cache=True) -> str:
+        # Scores are stored with one decimal, so 7, 7.0 and 7.04 share an answer
+        score = round(float(score), 1)
+        key = self.recommendation_key(score)
+        if use_cache:
+            cached = get_cached_recommendation(key)
+            if cached is not None:
+                return cached
+
         completion = self.generate(
-            client=self.client, prompt_template=prompt_template)
+            client=self.client, prompt_template=self.recommendation_prompt(score))
+        if completion is None:
+            return None
         raw_response = completion.choices[0].message.content
-        clean_response = raw_response.replace('\n', '')
+        store_recommendation(key, score, MODEL_NAME, RECOMMENDATION_CACHE_VERSION,
+                             raw_response, RECOMMENDATION_TTL)
         return raw_response
 
-    def fetch_score(self) -> int:
-        data = pd.read_csv(
-            "/Users/odaiclet/Desktop/coding_projects/spending_tracker_oct31/pages/util/User_1.csv")
-        data_json = data.tail(100)
+    def recommendation_stream(self, score=0, metrics=None):
+        """Like recommendation(), but yields the text as it is generated.
+
+        A cached answer is yielded in one piece. A freshly generated one is
+        stored once the stream completes; a stream abandoned midway (e.g. by a
+        Streamlit rerun) or one that fails yields what it has and is not cached.
+        `metrics` is filled as in generate_stream().
+        """
+        metrics = {} if metrics is None else metrics
+        score = round(float(score), 1)
+        key = self.recommendation_key(score)
+        cached = get_cached_recommendation(key)
+        if cached is not None:
+            metrics.update(streamed=False, completed=True, cached=True)
+            yield cached
+            return
+
+        parts = []
+        for content in self.generate_stream(self.client, self.recommendation_prompt(score), metrics):
+            parts.append(content)
+            yield content
+        if parts and metrics['completed']:
+            store_recommendation(key, score, MODEL_NAME, RECOMMENDATION_CACHE_VERSION,
+                                 "".join(parts), RECOMMENDATION_TTL)
+
+    def start_recommendation(self, score=0):
+        """The background RecommendationJob for `score`, started if none is in flight.
+
+        Reruns and other sessions asking for the same score while it is being
+        generated get the job that is already running instead of a new LLM call.
+        """
+        score = round(float(score), 1)
+        key = self.recommendation_key(score)
+        with _jobs_lock:
+            job = _jobs.get(key)
+            if job is None:
+                job = _jobs[key] = RecommendationJob(score)
+                _get_executor().submit(self._run_job, key, job)
+            return job
+
+    def _run_job(self, key, job):
+        metrics = {}
+        try:
+            for content in self.recommendation_stream(job.score, metrics):
+                job.append(content)
+        except Exception as e:
+            print(f"Ops! Recommendation job failed: {e}")
+        finally:
+            # Later requests read the cache (or retry after a failure)
+            with _jobs_lock:
+                _jobs.pop(key, None)
+            job.finish(metrics.get('completed', False))
+
+    def warm_recommendations(self, scores=SCORE_RANGE, force=False):
+        """Precompute recommendations for `scores`; returns (generated, already cached, failed)."""
+        generated = cached = failed = 0
+        for score in scores:
+            if not force and get_cached_recommendation(self.recommendation_key(score)) is not None:
+                cached += 1
+                continue
+            if self.recommendation(score, use_cache=False) is None:
+                failed += 1
+            else:
+                generated += 1
+            print(f"score {score:4.1f}: generated {generated}, cached {cached}, failed {failed}")
+        return generated, cached, failed
+
+    def fetch_score(self, data) -> int:
+        """Ask the model for a 1-10 spending score for `data`, a DataFrame of the user's transactions.
+
+        Only the SUMMARY_COLUMNS are used, condensed by summarize_transactions().
+
+        Returns None if the call fails or the answer holds no score.
+        """
         prompt_template = f'''<s>[INST]{self.score_prompt}
-        Data: {data_json.to_json()}\n
+        Data:
+{summarize_transactions(data)}\n
         Restrict your answer to absolutely one integer between 1 and 10. Don't provide an explanation for the answer.[/INST]
         '''
         completion = self.generate(
             client=self.client, prompt_template=prompt_template)
-        score = completion.choices[0].message.content
-        return score
+        if completion is None:
+            return None
+        return parse_score(completion.choices[0].message.content)
+
+
+def parse_score(text):
+    """First integer from 1 to 10 in a model answer, or None."""
+    match = SCORE_ANSWER.search(text or "")
+    return int(match.group(1)) if match else None
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RECOMMENDATION_WORKERS,
+                                           thread_name_prefix="recommendation")
+        return _executor
+
+
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def get_score_agent():
+    """Process-wide ScoreAgent, so reruns don't reload .env or build a new client."""
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            _agent = ScoreAgent()
+        return _agent
+
+
+if __name__ == "__main__":
+    # python -m pages.utils.agent warm [--force]
+    if sys.argv[1:2] != ["warm"]:
+        print("Usage: python -m pages.utils.agent warm [--force]")
+        sys.exit(2)
+    generated, cached, failed = get_score_agent().warm_recommendations(force="--force" in sys.argv)
+    print(f"Done: {generated} generated, {cached} already cached, {failed} failed.")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,75 @@
+import numpy as np
+import plotly.graph_objects as go
+from pages.utils.downsample import DEFAULT_POINTS, downsample_indices
+
+UP_COLOR = 'green'
+DOWN_COLOR = 'red'
+
+# Above this many points per-point value labels become unreadable, so they are dropped
+LABEL_LIMIT = 50
+
+
+def _segments(x, y, mask):
+    """x/y arrays drawing the segments (i-1, i) selected by `mask`, separated by gaps."""
+    ends = np.flatnonzero(mask) + 1
+    seg_x = np.empty(len(ends) * 3, dtype=object)
+    seg_y = np.empty(len(ends) * 3, dtype=object)
+    seg_x[0::3], seg_x[1::3], seg_x[2::3] = x[ends - 1], x[ends], None
+    seg_y[0::3], seg_y[1::3], seg_y[2::3] = y[ends - 1], y[ends], None
+    return seg_x, seg_y
+
+
+def balance_evolution_figure(balances, categories=None, title='Balance Evolution', show_labels=None,
+                             max_points=DEFAULT_POINTS):
+    """Balance line with green rises and red falls in a constant number of traces.
+
+    `balances` is ordered oldest first. Rising and falling segments each go into
+    one line trace (gaps split the segments), and a single marker trace carries
+    the per-point colours, the value labels and the category hover text. The
+    figure therefore has three traces and no annotations whatever the length.
+    Series longer than `max_points` are downsampled with LTTB; x keeps the
+    original transaction numbers.
+    """
+    y = np.asarray(balances, dtype='float64')
+    x = np.arange(1, len(y) + 1)
+    if len(y) > max_points:
+        keep = downsample_indices(x, y, max_points)
+        x, y = x[keep], y[keep]
+        if categories is not None:
+            categories = np.asarray(categories, dtype=object)[keep]
+    rising = np.diff(y) >= 0
+    if show_labels is None:
+        show_labels = len(y) <= LABEL_LIMIT
+
+    fig = go.Figure()
+    for mask, color, name in ((rising, UP_COLOR, 'Up'), (~rising, DOWN_COLOR, 'Down')):
+        seg_x, seg_y = _segments(x, y, mask)
+        fig.add_trace(go.Scatter(x=seg_x, y=seg_y, mode='lines', line=dict(color=color),
+                                 name=name, hoverinfo='skip', connectgaps=False))
+
+    # The first point has no previous balance; colour it as a rise
+    point_colors = np.where(np.concatenate(([True], rising)), UP_COLOR, DOWN_COLOR)
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=y,
+        mode='markers+text' if show_labels else 'markers',
+        marker=dict(color=point_colors),
+        text=[f"${balance:.2f}" for balance in y] if show_labels else None,
+        textposition='top center',
+        textfont=dict(color='white'),
+        hovertext=list(categories) if categories is not None else None,
+        hovertemplate='#%{x}: $%{y:.2f}<br>%{hovertext}<extra></extra>' if categories is not None else None,
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title='Transaction Number',
+        yaxis_title='Balance',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False)
+    )
+    return fig
@@ -15,9 +15,35 @@ RECOMENDATION_PROMPT = f'''
         SS 9-10: Previous rewards remain active. +1% cashback on seasonal cashback rewards hosted by Discover.
         '''
 SCORE_PROMPT = f'''
-        You are an expert Data Scientist. Please use the historical financial data provided below in json format and derive a 'spending score' which will be a number between 1 and 10.
+        You are an expert Data Scientist. Please use the historical financial data summarized below (overall ratios and a per-month table of income, spending and top spending categories) and derive a 'spending score' which will be a number between 1 and 10.
         Consider the following examples to approprietly calculate the score:
         A student has a score of 7, this means that their spending is considered regular hence their spending can get better.
         A student has a score of 9, this means that their spending is considered very good, there are only a few things that would make it better.
         A student has a score of 3, this means that their spending is considered bad, recommendations on how to manage their budget would be necessary.
         '''
+
+# Served when no LLM recommendation is ready in time; keyed by the reward tier's
+# upper score bound
+FALLBACK_RECOMMENDATIONS = {
+    3: """Your Spending Score of {score} means there is real room to improve, and every step counts:
+1. Set a monthly budget on the Get Started tab and check it weekly.
+2. Cover rent, groceries and utilities first, then plan everything else.
+3. Cut back on dining out and entertainment until you are back under budget.
+4. Keep your balance positive to avoid overdraft fees.
+5. Grocery purchases already earn you +1% cashback, so plan meals around them.""",
+    6: """Your Spending Score of {score} is a solid start:
+1. Compare this month's spending against your budget on the Spending Tracker.
+2. Pick one category where you overspend and set yourself a limit for it.
+3. Put a fixed amount into savings as soon as income arrives.
+4. Review subscriptions and cancel the ones you don't use.
+5. Keep it up: online purchases now also earn +1% cashback.""",
+    8: """Your Spending Score of {score} shows good habits:
+1. Keep tracking every transaction so your budget stays accurate.
+2. Build an emergency fund of at least one month of expenses.
+3. Watch for irregular spikes in spending and plan for them in advance.
+4. Make the most of +2% cashback on linked subscription rewards.""",
+    10: """Your Spending Score of {score} is excellent:
+1. Keep your budget and savings routine exactly as it is.
+2. Consider raising your savings goal now that your spending is under control.
+3. Watch for Discover's seasonal cashback rewards, which your score unlocks.""",
+}
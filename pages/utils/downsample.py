@@ -0,0 +1,75 @@
+import numpy as np
+
+# Roughly the plotted width in pixels: more points than this can't be told apart
+DEFAULT_POINTS = 1000
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-triangle-three-buckets: indices of `n_out` points keeping the shape of (x, y).
+
+    `x` must be numeric and increasing (convert datetimes to int64 first). The
+    first and last points are always kept. LTTB picks the most prominent point
+    per bucket but can still pass over a series' single highest or lowest
+    value, so the global extremes are added back on top (at most n_out + 2).
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+
+    # n_out - 2 buckets over the interior points; each holds at least one point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area between the previous pick, each candidate
+        # and the next bucket's average; the constant factor doesn't matter
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return np.union1d(selected, [np.argmin(y), np.argmax(y)])
+
+
+def minmax_indices(y, n_out):
+    """Indices of each bucket's minimum and maximum, plus the first and last point.
+
+    Uses n_out // 2 equal buckets, so every peak and trough of the original is
+    kept exactly; the result has at most n_out + 2 points.
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    buckets = n_out // 2
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(buckets, size)
+    # The last bucket may be all padding when n is just above a multiple of size
+    filled = ~np.isnan(grid).all(axis=1)
+    grid = grid[filled]
+    offsets = np.flatnonzero(filled) * size
+    minima = offsets + np.nanargmin(grid, axis=1)
+    maxima = offsets + np.nanargmax(grid, axis=1)
+    return np.unique(np.concatenate(([0, n - 1], minima, maxima)))
+
+
+def downsample_indices(x, y, n_out=DEFAULT_POINTS, method='lttb'):
+    """Sorted indices of the points to plot: 'lttb' for shape, 'minmax' for exact extremes."""
+    if method == 'lttb':
+        return lttb_indices(x, y, n_out)
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from db.cache import data_version
+
+
+class FigureCache:
+    """Bounded LRU of built Plotly figures (or other values derived from a user's data).
+
+    Keys carry the user's data version, so any insert for that user makes its
+    old figures unreachable; they then age out of the LRU. Builders return a
+    figure or None ("nothing to plot"), and both outcomes are cached.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._figures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # Build outside the lock; two sessions racing on one key just both build
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._figures)}
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(user_id, view, build, *params):
+    """Figure for (user_id, view, *params) at the user's current data version.
+
+    `params` are whatever else the figure depends on (period, year, the date
+    relative periods were resolved against, ...). The returned figure is shared
+    between reruns and sessions: pass it to st.plotly_chart as is and don't
+    modify it.
+    """
+    key = (user_id, view, *params, data_version(user_id))
+    return figure_cache.get_or_build(key, build)
@@ -0,0 +1,77 @@
+import pandas as pd
+
+# Score prompts describe the history as a per-month table instead of raw rows:
+# the newest PROMPT_MONTHS months get a row each (older ones are folded into a
+# single "earlier" row) with up to PROMPT_CATEGORIES categories per month, and
+# the table is cut further if it would exceed PROMPT_TOKEN_BUDGET
+PROMPT_MONTHS = 12
+PROMPT_CATEGORIES = 4
+PROMPT_TOKEN_BUDGET = 600
+SUMMARY_COLUMNS = ('date', 'amount', 'category', 'balance')
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count (about four characters per token for English and numbers)."""
+    return len(text) // 4 + 1
+
+
+def _money(value):
+    return f"{value:,.0f}"
+
+
+def summarize_transactions(data, months=PROMPT_MONTHS, categories=PROMPT_CATEGORIES,
+                           token_budget=PROMPT_TOKEN_BUDGET) -> str:
+    """Compact text summary of a transactions DataFrame (date, amount, category, balance).
+
+    The size depends on `months` and `categories`, not on how many rows
+    `data` has, so any length of history fits the same budget.
+    """
+    if data.empty:
+        return "No transactions."
+    df = pd.DataFrame({
+        'month': pd.to_datetime(data['date']).dt.to_period('M'),
+        'amount': data['amount'].astype('float64'),
+        'category': data['category'].astype(object).fillna('Uncategorized'),
+    })
+    df['spent'] = (-df['amount']).clip(lower=0)
+    df['income'] = df['amount'].clip(lower=0)
+    monthly = df.groupby('month')[['income', 'spent']].sum()
+    by_category = df[df['spent'] > 0].groupby(['month', 'category'])['spent'].sum()
+
+    income, spent = monthly['income'].sum(), monthly['spent'].sum()
+    category_totals = by_category.groupby(level='category').sum().sort_values(ascending=False)
+    mean_spent = monthly['spent'].mean()
+    ratios = [
+        f"savings rate {(income - spent) / income:.0%}" if income > 0 else "no income recorded",
+        f"largest category {category_totals.index[0]} {category_totals.iloc[0] / spent:.0%} of spending"
+        if spent > 0 else "no spending recorded",
+        f"monthly spending variation {monthly['spent'].std(ddof=0) / mean_spent:.0%}" if mean_spent > 0 else None,
+        f"{int((data['balance'] < 0).sum())} transactions left a negative balance" if 'balance' in data else None,
+    ]
+    header = [
+        f"History: {len(data)} transactions over {len(monthly)} months "
+        f"({monthly.index.min()} to {monthly.index.max()}).",
+        f"Totals: income {_money(income)}, spent {_money(spent)}; " + ", ".join(r for r in ratios if r) + ".",
+        "month | income | spent | net | top categories by spending",
+    ]
+
+    def row(label, income, spent, top):
+        top_text = ", ".join(f"{category} {_money(amount)}" for category, amount in top.items())
+        return f"{label} | {_money(income)} | {_money(spent)} | {_money(income - spent)} | {top_text}"
+
+    while True:
+        recent = monthly.iloc[-months:] if months > 0 else monthly.iloc[0:0]
+        earlier = monthly.iloc[:len(monthly) - len(recent)]
+        lines = list(header)
+        if not earlier.empty:
+            earlier_categories = by_category[by_category.index.get_level_values('month').isin(earlier.index)]
+            top = earlier_categories.groupby(level='category').sum().nlargest(categories)
+            lines.append(row(f"{earlier.index.min()} to {earlier.index.max()} (total)",
+                             earlier['income'].sum(), earlier['spent'].sum(), top))
+        for month, values in recent.iterrows():
+            top = by_category.get(month, pd.Series(dtype='float64')).nlargest(categories)
+            lines.append(row(str(month), values['income'], values['spent'], top))
+        text = "\n".join(lines)
+        if estimate_tokens(text) <= token_budget or months == 0:
+            return text
+        months -= 1
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+import pandas as pd
+from db.cache import invalidate_user
+from db.db_functions import fetch_transactions_since
+from db.queries import resolve_period
+from db.streaming import fetch_daily_balances
+
+# Users whose balances stay in memory; the least recently used store is dropped first
+MAX_USERS = 64
+
+BALANCE_COLUMNS = ('date', 'transaction_id', 'balance')
+
+
+class TransactionStore:
+    """One user's history reduced to closing balances per day, kept current by deltas.
+
+    The first sync streams the daily balances through a server-side cursor;
+    after that sync() only asks for rows with a transaction_id above the
+    highest one already held, which is a primary key range scan returning
+    nothing on most reruns. Memory grows with the number of days, not
+    transactions. This relies on the ledger being append-only: the app never
+    updates or deletes transactions, and a row's balance is fixed when it is
+    inserted. Call reset() after any out-of-band edit.
+
+    A sync that changes the balances bumps the user's data version, so cached
+    figures and user info built before rows arrived from another process are
+    rebuilt too.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.last_id = 0
+        self._lock = threading.Lock()
+        self._df = None
+
+    def sync(self):
+        """Fold in rows inserted since the last sync; returns how many arrived."""
+        with self._lock:
+            if self._df is None:
+                df = fetch_daily_balances(self.user_id, 'All time')
+                arrived = len(df)
+            else:
+                delta = fetch_transactions_since(self.user_id, self.last_id, BALANCE_COLUMNS)
+                if delta.empty:
+                    return 0
+                arrived = len(delta)
+                # Delta ids are above every stored id, so a delta row sorts last within
+                # its day. An empty initial load has no dtypes worth keeping.
+                frames = [delta] if self._df.empty else [self._df, delta]
+                df = pd.concat(frames, ignore_index=True)
+                df = df.sort_values(['date', 'transaction_id'], ignore_index=True)
+                df = df.drop_duplicates('date', keep='last', ignore_index=True)
+            self._df = df
+            if not df.empty:
+                # The highest id is always its own day's closing row
+                self.last_id = int(df['transaction_id'].max())
+        invalidate_user(self.user_id)
+        return arrived
+
+    def reset(self):
+        with self._lock:
+            self._df = None
+            self.last_id = 0
+
+    def daily_balances(self, period='All time', year=None, today=None):
+        """Same rows as db.streaming.fetch_daily_balances for the period."""
+        df = self._df
+        start, end = resolve_period(period, year, today)
+        if start is None:
+            return df
+        dates = df['date']
+        return df[(dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end))].reset_index(drop=True)
+
+
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def transaction_store(user_id):
+    """The user's shared store, synced with the database before it is returned."""
+    with _stores_lock:
+        store = _stores.get(user_id)
+        if store is None:
+            store = _stores[user_id] = TransactionStore(user_id)
+        _stores.move_to_end(user_id)
+        while len(_stores) > MAX_USERS:
+            _stores.popitem(last=False)
+    store.sync()
+    return store
@@ -0,0 +1,166 @@
+"""Batch spending-score job: score every user and upsert into Spending_Scores.
+
+Users are processed in batches. Inside a batch each user's input is built
+from the database and scored on a bounded thread pool, with calls spaced by a
+rate limiter and retried with exponential backoff. Each batch's results are
+written with one upsert into Spending_Scores under the run's run_id, which
+also advances Account_State, so an interrupted run can be resumed: only users
+without a score in that run are picked up again.
+
+    python -m scoring.batch [--scorer llm|local] [--concurrency 4] [--rate 2]
+                            [--batch-size 50] [--resume RUN_ID]
+
+Scorers with a score_many() method (the local engine) get each batch in one
+vectorized call instead of going through the thread pool; users they can't
+score (no activity in the engine's window) are skipped, not failed.
+
+Needs `python -m db.migrate up` (migration 0006 adds Score_Runs).
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from db.db_functions import fetch_transactions_columnar
+from db.scores import (start_score_run, fetch_score_run, fetch_unscored_users,
+                       upsert_run_scores, finish_score_run)
+from scoring.engine import LocalScorer
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 2.0  # scorer calls per second, across all workers
+DEFAULT_BATCH_SIZE = 50
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads; rate=0 disables it."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def with_retries(call, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    """call() until it returns something other than None, backing off 1x, 2x, 4x ... with jitter."""
+    for attempt in range(attempts):
+        try:
+            result = call()
+            if result is not None:
+                return result
+        except Exception as e:
+            print(f"Scoring attempt {attempt + 1} failed: {e}")
+        if attempt + 1 < attempts:
+            time.sleep(base_delay * 2 ** attempt * (1 + random.random() / 4))
+    return None
+
+
+class LLMScorer:
+    """Scores one user at a time with ScoreAgent.fetch_score on a summary of their full history."""
+
+    name = "llm"
+
+    def __init__(self):
+        # Imported here so other scorers don't need the LLM client installed
+        from pages.utils.agent import get_score_agent
+        from pages.utils.history_summary import SUMMARY_COLUMNS
+        self.agent = get_score_agent()
+        self.columns = SUMMARY_COLUMNS
+
+    def score(self, user_id):
+        data = fetch_transactions_columnar(user_id, "All time", columns=self.columns)
+        if data.empty:
+            return None
+        return self.agent.fetch_score(data)
+
+
+SCORERS = {
+    LLMScorer.name: LLMScorer,
+    LocalScorer.name: LocalScorer,
+}
+
+
+def score_users(scorer, user_ids, concurrency, limiter):
+    """{user_id: score} for the users that could be scored; failures are left out."""
+    def one(user_id):
+        def call():
+            limiter.acquire()
+            return scorer.score(user_id)
+        return user_id, with_retries(call)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scoring") as executor:
+        return {user_id: score for user_id, score in executor.map(one, user_ids) if score is not None}
+
+
+def run(scorer_name="llm", concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+        batch_size=DEFAULT_BATCH_SIZE, resume=None):
+    """Run (or resume) a scoring run; returns (run_id, users scored, users failed)."""
+    if resume is not None:
+        existing = fetch_score_run(resume)
+        if existing is None:
+            print(f"Score run {resume} not found.")
+            return None, 0, 0
+        run_id, scorer_name = existing[0], existing[1]
+    else:
+        run_id = start_score_run(scorer_name)
+        if run_id is None:
+            return None, 0, 0
+
+    scorer = SCORERS[scorer_name]()
+    limiter = RateLimiter(rate)
+    user_ids = fetch_unscored_users(run_id)
+    print(f"Run {run_id} ({scorer_name}): {len(user_ids)} users to score")
+
+    scored = failed = skipped = 0
+    started = time.perf_counter()
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset:offset + batch_size]
+        if hasattr(scorer, "score_many"):
+            scores = scorer.score_many(batch)
+            batch_failed, batch_skipped = 0, len(batch) - len(scores)
+        else:
+            scores = score_users(scorer, batch, concurrency, limiter)
+            batch_failed, batch_skipped = len(batch) - len(scores), 0
+        written = upsert_run_scores(run_id, scores, failed=batch_failed)
+        if written is None:
+            failed += len(scores) + batch_failed
+        else:
+            scored += written
+            failed += batch_failed
+        skipped += batch_skipped
+        elapsed = time.perf_counter() - started
+        done = offset + len(batch)
+        print(f"{done}/{len(user_ids)} users, {scored} scored, {failed} failed, "
+              f"{skipped} skipped, {done / elapsed:.2f} users/s")
+
+    if failed == 0:
+        finish_score_run(run_id)
+    else:
+        print(f"Run {run_id} left open; resume it with --resume {run_id} to retry failed users.")
+    elapsed = time.perf_counter() - started
+    print(f"Run {run_id}: {scored} scored, {failed} failed, {skipped} skipped in {elapsed:.1f}s "
+          f"({len(user_ids) / elapsed if elapsed else 0:.2f} users/s)")
+    return run_id, scored, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score every user into Spending_Scores.")
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default="llm")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="maximum scorer calls per second (0 for no limit)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--resume", type=int, metavar="RUN_ID")
+    args = parser.parse_args()
+    run_id, _, failed = run(args.scorer, args.concurrency, args.rate, args.batch_size, args.resume)
+    sys.exit(1 if run_id is None or failed else 0)
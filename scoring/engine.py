@@ -0,0 +1,179 @@
+"""Deterministic spending score computed locally from engineered features.
+
+Every user is scored at once with vectorized pandas/NumPy over a few
+set-based aggregates (see db.scores.fetch_scoring_inputs), so scoring needs
+no LLM round trip and the same data always gives the same score. Features,
+each mapped onto a 0..1 sub-score where 1 is best:
+
+- budget adherence: per month, how far spending overshot the budget in force
+  that month (1 = never over budget); 0.5 when the user never set a budget
+- savings rate: (income - spending) / income over the window
+- category mix: share of spending in discretionary categories
+- volatility: coefficient of variation of monthly spending
+- overdrafts: transactions that left a negative balance
+
+The weighted sum maps onto 1.0 .. 10.0 with one decimal, like Spending_Scores.
+
+    python -m scoring.engine score <user_id>
+    python -m scoring.engine agreement [llm_run_id]
+"""
+import sys
+from datetime import date
+import numpy as np
+import pandas as pd
+from db.scores import fetch_scoring_inputs, fetch_latest_run_id, fetch_run_scores
+
+WINDOW_MONTHS = 6
+
+DISCRETIONARY_CATEGORIES = ('Dining Out', 'Entertainment', 'Gift')
+
+WEIGHTS = {
+    'budget_adherence': 0.35,
+    'savings_rate': 0.25,
+    'category_mix': 0.15,
+    'volatility': 0.10,
+    'overdrafts': 0.15,
+}
+
+FEATURE_COLUMNS = ['budget_adherence', 'savings_rate', 'discretionary_share',
+                   'spending_cv', 'overdrafts']
+
+
+def window_start(today=None, months=WINDOW_MONTHS):
+    """First day of the month `months - 1` months before today's month."""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def compute_features(inputs):
+    """Per-user raw features (indexed by user_id) from fetch_scoring_inputs() frames.
+
+    Only users with at least one month of activity in the window get a row.
+    """
+    monthly = inputs['monthly']
+    if monthly.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS, index=pd.Index([], name='user_id'))
+
+    # Budget in force for each month: the latest one set on or before the month's last day
+    monthly = monthly.assign(month_end=monthly['month'] + pd.offsets.MonthEnd(0)).sort_values('month_end')
+    budgets = inputs['budgets'].sort_values('date')
+    if budgets.empty:
+        monthly['monthly_limit'] = np.nan
+    else:
+        monthly = pd.merge_asof(monthly, budgets[['user_id', 'date', 'monthly_limit']],
+                                left_on='month_end', right_on='date', by='user_id', direction='backward')
+    limit = monthly['monthly_limit'].where(monthly['monthly_limit'] > 0)
+    overshoot = (monthly['spent'] / limit - 1).clip(lower=0)
+    monthly['adherence'] = (1 - overshoot).clip(0, 1)
+
+    per_user = monthly.groupby('user_id')
+    spent = per_user['spent'].sum()
+    income = per_user['income'].sum()
+    mean_spent = per_user['spent'].mean()
+    features = pd.DataFrame({
+        'budget_adherence': per_user['adherence'].mean(),
+        # No income at all counts as the worst rate when there was spending
+        'savings_rate': np.where(income > 0, (income - spent) / income.where(income > 0),
+                                 np.where(spent > 0, -1.0, 0.0)),
+        'spending_cv': (per_user['spent'].std(ddof=0) / mean_spent.where(mean_spent > 0)).fillna(0.0),
+    })
+
+    categories = inputs['categories']
+    if categories.empty:
+        features['discretionary_share'] = 0.0
+    else:
+        discretionary = categories['spent'].where(
+            categories['category'].isin(DISCRETIONARY_CATEGORIES), 0.0)
+        totals = categories.assign(discretionary=discretionary).groupby('user_id')[['discretionary', 'spent']].sum()
+        share = totals['discretionary'] / totals['spent'].where(totals['spent'] > 0)
+        features['discretionary_share'] = share.reindex(features.index).fillna(0.0)
+
+    overdrafts = inputs['overdrafts']
+    if overdrafts.empty:
+        features['overdrafts'] = 0.0
+    else:
+        features['overdrafts'] = overdrafts.set_index('user_id')['overdrafts'].reindex(features.index).fillna(0.0)
+
+    features.index.name = 'user_id'
+    return features[FEATURE_COLUMNS]
+
+
+def score_features(features):
+    """1.0 .. 10.0 scores (a Series indexed like `features`) from compute_features() output."""
+    subscores = pd.DataFrame({
+        'budget_adherence': features['budget_adherence'].fillna(0.5),
+        # -20% savings rate or worse scores 0, +30% or better scores 1
+        'savings_rate': ((features['savings_rate'] + 0.2) / 0.5).clip(0, 1),
+        # Half of all spending on discretionary categories or more scores 0
+        'category_mix': 1 - (features['discretionary_share'] / 0.5).clip(0, 1),
+        'volatility': 1 - features['spending_cv'].clip(0, 1),
+        'overdrafts': 1 / (1 + features['overdrafts']),
+    }, index=features.index)
+    weights = pd.Series(WEIGHTS)
+    combined = subscores[weights.index].to_numpy() @ weights.to_numpy()
+    return pd.Series(np.round(1 + 9 * combined, 1), index=features.index, name='score')
+
+
+class LocalScorer:
+    """Scorer backed by this module; scores a whole batch of users per call."""
+
+    name = "local"
+
+    def __init__(self, months=WINDOW_MONTHS):
+        self.months = months
+
+    def score_many(self, user_ids=None, today=None):
+        """{user_id: score} for users with activity in the window; all users when user_ids is None."""
+        inputs = fetch_scoring_inputs(window_start(today, self.months), user_ids)
+        if inputs is None:
+            return {}
+        scores = score_features(compute_features(inputs))
+        return {int(user_id): float(score) for user_id, score in scores.items()}
+
+    def score(self, user_id, today=None):
+        return self.score_many([user_id], today).get(user_id)
+
+
+def agreement_report(run_id=None):
+    """Compare local scores with the LLM scores of `run_id` (default: latest completed llm run)."""
+    run_id = run_id or fetch_latest_run_id("llm")
+    if run_id is None:
+        print("No completed llm score run to compare against; run `python -m scoring.batch --scorer llm` first.")
+        return None
+    llm = pd.Series(fetch_run_scores(run_id), dtype='float64')
+    local = pd.Series(LocalScorer().score_many(list(llm.index)), dtype='float64')
+    both = pd.DataFrame({'llm': llm, 'local': local}).dropna()
+    if both.empty:
+        print(f"Run {run_id} has no users the local engine can score.")
+        return None
+
+    difference = (both['local'] - both['llm']).abs()
+    report = {
+        'run_id': run_id,
+        'users': len(both),
+        'mean_absolute_difference': float(difference.mean()),
+        'within_1_point': float((difference <= 1).mean()),
+        'spearman': float(both['llm'].corr(both['local'], method='spearman')) if len(both) > 1 else float('nan'),
+        'mean_llm': float(both['llm'].mean()),
+        'mean_local': float(both['local'].mean()),
+    }
+    print(f"Local engine vs llm run {run_id} over {report['users']} users")
+    print(f"  mean |local - llm|: {report['mean_absolute_difference']:.2f} points")
+    print(f"  within 1 point:     {report['within_1_point']:.0%}")
+    print(f"  Spearman rank corr: {report['spearman']:.2f}")
+    print(f"  mean score:         llm {report['mean_llm']:.2f}, local {report['mean_local']:.2f}")
+    return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "score" and len(sys.argv) > 2:
+        user_id = int(sys.argv[2])
+        print(f"User {user_id}: {LocalScorer().score(user_id)}")
+    elif command == "agreement":
+        report = agreement_report(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        sys.exit(0 if report else 1)
+    else:
+        print("Usage: python -m scoring.engine score <user_id> | agreement [llm_run_id]")
+        sys.exit(1)